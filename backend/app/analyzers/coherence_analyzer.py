@@ -1,32 +1,65 @@
 """Coherence analyzer for text flow and structure analysis."""
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
 import re
-from sklearn.metrics.pairwise import cosine_similarity
 
 from app.analyzers.base_analyzer import BaseAnalyzer
+from app.analyzers.model_loader import get_sentence_model
 from app.models.schemas import CoherenceScore
-from app.services.gemini_service import GeminiService
+from app.services.gemini_service import get_gemini_service
+from app.services.semantic_cache import SemanticCache
+from app.utils.embedding_cache import CachedEncoder, int8_dot
+from app.utils.json_utils import extract_json
+from app.utils.readability import readability_metrics
 from app.config import settings
 
+# Sentence boundary: terminal punctuation followed by a capitalized word
+_SENT_SPLIT_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z])')
+
+# Paragraph boundary: a blank line
+_PARA_RE = re.compile(r'\n\s*\n')
+
+# Bridging sentences shorter than this are too noisy to embed
+_MIN_CONNECTION_WORDS = 4
+
+# Words ignored when checking whether two sentences share a topic
+_STOPWORDS = frozenset({'the', 'a', 'an', 'is', 'are', 'was', 'were'})
+
 class CoherenceAnalyzer(BaseAnalyzer):
     """Analyzer for text coherence, flow, and structure."""
     
     def __init__(self):
         super().__init__("CoherenceAnalyzer")
         
-        # Initialize sentence transformer for semantic similarity
-        self.sentence_model = SentenceTransformer(settings.embedding_model)
+        # Shared sentence transformer for semantic similarity, loaded once per process
+        self.sentence_model = get_sentence_model()
+        
+        # Cache embeddings so repeated sentences skip the transformer. Coherence
+        # only compares similarities against coarse thresholds, so int8 is enough
+        model_id = settings.embedding_model.replace('/', '--')
+        disk_dir = None
+        if settings.cache_enabled and settings.embedding_disk_cache:
+            disk_dir = settings.cache_dir / "embeddings" / f"{model_id}-int8"
+        self.encoder = CachedEncoder(
+            self.sentence_model,
+            maxsize=10_000,
+            precision="int8",
+            disk_dir=disk_dir,
+            batch_size=settings.embedding_batch_size
+        )
         
-        # Initialize Gemini service
-        self.gemini_service = GeminiService() if settings.gemini_api_key else None
+        # Shared Gemini service
+        self.gemini_service = get_gemini_service()
         
-        # Thread pool for CPU-bound operations
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        # Near-identical resubmissions reuse earlier Gemini feedback instead of a new round trip
+        self.feedback_cache = None
+        if self.gemini_service and settings.cache_enabled:
+            self.feedback_cache = SemanticCache(
+                settings.cache_dir / "semantic" / f"coherence-{model_id}",
+                threshold=settings.coherence_cache_threshold
+            )
         
         # Transition words categorized by type
         self.transition_words = {
@@ -43,6 +76,22 @@ class CoherenceAnalyzer(BaseAnalyzer):
             'conclusion': ['in conclusion', 'to conclude', 'in summary', 'overall',
                           'to sum up', 'finally', 'in brief', 'ultimately']
         }
+        
+        # One named group per category so a single regex scan finds the transition
+        self._transition_re = re.compile(
+            r'(?:^| )(?:' + '|'.join(
+                f"(?P<{transition_type}>{'|'.join(re.escape(w) for w in words)})"
+                for transition_type, words in self.transition_words.items()
+            ) + ')',
+            re.IGNORECASE
+        )
+        
+        # Single-word transitions keyed by word, for an O(1) check of the opening word
+        self._transition_first = {}
+        for transition_type, words in self.transition_words.items():
+            for word in words:
+                if ' ' not in word:
+                    self._transition_first.setdefault(word, transition_type)
     
     async def analyze(self, text: str, use_api: bool = True, **kwargs) -> CoherenceScore:
         """Analyze text coherence and flow.
@@ -50,6 +99,7 @@ class CoherenceAnalyzer(BaseAnalyzer):
         Args:
             text: Text to analyze
             use_api: Whether to use Gemini API for advanced analysis
+            api_request: Optional CombinedRequest shared with the other analyzers
             
         Returns:
             CoherenceScore object with analysis results
@@ -57,99 +107,226 @@ class CoherenceAnalyzer(BaseAnalyzer):
         # Preprocess text
         processed_text = self.preprocess_text(text)
         
+        # Dispatch the API call as soon as the document embedding is ready so
+        # its round trip overlaps the rest of the local work
+        doc_vector = asyncio.get_running_loop().create_future()
+        api_task = None
+        if use_api and self._api_eligible(processed_text):
+            async def api_feedback():
+                # Only the semantic cache lookup has to wait for the embedding
+                vector = await doc_vector if self.feedback_cache is not None else None
+                return await self._get_cached_api_feedback(
+                    processed_text, vector, kwargs.get('api_request')
+                )
+            api_task = asyncio.create_task(api_feedback())
+        
+        # Don't leave the API task running if local analysis fails
+        try:
+            local = await self._analyze_local(processed_text, doc_vector)
+        except BaseException:
+            if api_task:
+                api_task.cancel()
+            raise
+        
+        # Collect API feedback last, after the local work has finished
+        api_feedback = None
+        if api_task:
+            try:
+                api_feedback = await api_task
+            except Exception as e:
+                self.logger.warning(f"API analysis failed: {e}")
+        
+        return self._build_score(local, api_feedback)
+    
+    async def analyze_local(self, text: str) -> Dict[str, Any]:
+        """Run only the local, CPU-bound part of the analysis.
+        
+        Args:
+            text: Text to analyze
+            
+        Returns:
+            Picklable local results for complete()
+        """
+        return await self._analyze_local(self.preprocess_text(text))
+    
+    async def complete(self, local: Dict[str, Any], api_request=None) -> CoherenceScore:
+        """Add Gemini feedback to the results of analyze_local().
+        
+        Args:
+            local: Result of analyze_local()
+            api_request: Optional CombinedRequest shared with the other analyzers
+            
+        Returns:
+            CoherenceScore object with analysis results
+        """
+        api_feedback = None
+        if self._api_eligible(local['text']):
+            try:
+                api_feedback = await self._get_cached_api_feedback(
+                    local['text'], local['doc_vector'], api_request
+                )
+            except Exception as e:
+                self.logger.warning(f"API analysis failed: {e}")
+        
+        return self._build_score(local, api_feedback)
+    
+    def _api_eligible(self, text: str) -> bool:
+        """Whether a text is sent to Gemini at all."""
+        return self.gemini_service is not None and len(text) < 2000
+    
+    async def _analyze_local(self, processed_text: str,
+                             doc_vector: Optional["asyncio.Future"] = None) -> Dict[str, Any]:
+        """Compute the flow, transition and readability results of a text.
+        
+        Args:
+            processed_text: Preprocessed text
+            doc_vector: Optional future resolved with the document embedding
+                as soon as the sentences are encoded
+            
+        Returns:
+            Local results, including the document embedding
+        """
         # Split into sentences and paragraphs
         sentences = self._split_sentences(processed_text)
         paragraphs = self._split_paragraphs(processed_text)
         
+        # Readability is independent of the embeddings, so compute it concurrently
+        loop = asyncio.get_event_loop()
+        readability_task = loop.run_in_executor(
+            self.executor,
+            self._calculate_readability_metrics,
+            processed_text
+        )
+        
+        # Encode every sentence needed by the flow and transition checks in one pass
+        paragraph_sentences = [self._split_sentences(p) for p in paragraphs]
+        boundary_pairs = self._paragraph_boundaries(paragraph_sentences)
+        needed_sentences = list(sentences) if len(sentences) > 1 else []
+        for pair in boundary_pairs:
+            if pair:
+                needed_sentences.extend(pair)
+        embeddings = await self._encode_sentences(list(dict.fromkeys(needed_sentences)))
+        
+        # Release the API call before waiting on readability
+        vector = self._document_vector(sentences, embeddings)
+        if doc_vector is not None:
+            doc_vector.set_result(vector)
+        readability_scores = await readability_task
+        
         # Calculate sentence flow using embeddings
-        sentence_flow = await self._calculate_sentence_flow(sentences)
+        sentence_flow = self._calculate_sentence_flow(sentences, embeddings)
         
         # Analyze paragraph transitions
-        paragraph_transitions = self._analyze_paragraph_transitions(paragraphs)
+        paragraph_transitions = self._analyze_paragraph_transitions(
+            paragraphs, boundary_pairs, embeddings
+        )
         
         # Find weak connections
         weak_connections = self._identify_weak_connections(sentences, sentence_flow)
         
-        # Calculate readability scores
-        readability_scores = self._calculate_readability_metrics(processed_text)
-        
-        # Use API for advanced analysis if available
-        api_feedback = None
-        if use_api and self.gemini_service and len(processed_text) < 2000:
-            try:
-                api_feedback = await self._get_api_feedback(processed_text)
-            except Exception as e:
-                self.logger.warning(f"API analysis failed: {e}")
-        
+        return {
+            'text': processed_text,
+            'doc_vector': vector,
+            'sentence_flow': sentence_flow,
+            'paragraph_transitions': paragraph_transitions,
+            'weak_connections': weak_connections,
+            'readability_scores': readability_scores
+        }
+    
+    def _build_score(self, local: Dict[str, Any],
+                     api_feedback: Optional[Dict[str, Any]]) -> CoherenceScore:
+        """Score the local results and merge in the API feedback."""
         # Calculate final score
         score = self._calculate_coherence_score(
-            sentence_flow, 
-            paragraph_transitions, 
-            weak_connections,
-            readability_scores
+            local['sentence_flow'], 
+            local['paragraph_transitions'], 
+            local['weak_connections'],
+            local['readability_scores']
         )
         
         # Generate suggestions
         suggestions = self._generate_suggestions(
-            sentence_flow,
-            paragraph_transitions,
-            weak_connections,
+            local['sentence_flow'],
+            local['paragraph_transitions'],
+            local['weak_connections'],
             api_feedback
         )
         
         return CoherenceScore(
             score=score,
-            sentence_flow=sentence_flow,
-            paragraph_transitions=paragraph_transitions,
-            weak_connections=weak_connections,
+            sentence_flow=local['sentence_flow'].tolist(),
+            paragraph_transitions=local['paragraph_transitions'],
+            weak_connections=local['weak_connections'],
             suggestions=suggestions,
-            readability_scores=readability_scores
+            readability_scores=local['readability_scores']
         )
     
-    async def _calculate_sentence_flow(self, sentences: List[str]) -> List[float]:
-        """Calculate semantic similarity between consecutive sentences."""
-        if len(sentences) < 2:
-            return []
+    async def _encode_sentences(self, sentences: List[str]) -> Dict[str, np.ndarray]:
+        """Encode sentences in a single batched call and map them to their embeddings."""
+        if not sentences:
+            return {}
         
-        # Get embeddings for all sentences
         loop = asyncio.get_event_loop()
         embeddings = await loop.run_in_executor(
             self.executor,
-            self.sentence_model.encode,
+            self.encoder.encode,
             sentences
         )
         
-        # Calculate similarities between consecutive sentences
-        similarities = []
-        for i in range(len(embeddings) - 1):
-            similarity = cosine_similarity(
-                embeddings[i].reshape(1, -1),
-                embeddings[i + 1].reshape(1, -1)
-            )[0][0]
-            similarities.append(float(similarity))
+        return dict(zip(sentences, embeddings))
+    
+    def _calculate_sentence_flow(self, sentences: List[str],
+                                 embeddings: Dict[str, np.ndarray]) -> np.ndarray:
+        """Calculate semantic similarity between consecutive sentences."""
+        if len(sentences) < 2:
+            return np.empty(0, dtype=np.float64)
+        
+        # Embeddings are unit length, so cosine similarity is a row-wise dot product
+        matrix = np.stack([embeddings[sentence] for sentence in sentences])
+        similarities = int8_dot(matrix[:-1], matrix[1:])
         
         return similarities
     
-    def _analyze_paragraph_transitions(self, paragraphs: List[str]) -> List[Dict[str, Any]]:
+    def _paragraph_boundaries(self, paragraph_sentences: List[List[str]]) -> List[Optional[Tuple[str, str]]]:
+        """Get the (last sentence, first sentence) pair at each paragraph boundary.
+        
+        Boundaries without a usable pair, including ones where either sentence
+        is too short to embed meaningfully, are None and score no connection.
+        
+        Args:
+            paragraph_sentences: Sentences of each paragraph, split once up front
+            
+        Returns:
+            One entry per boundary between consecutive paragraphs
+        """
+        boundaries = []
+        
+        for current_sentences, next_sentences in zip(paragraph_sentences, paragraph_sentences[1:]):
+            if (current_sentences and next_sentences
+                    and len(current_sentences[-1].split()) >= _MIN_CONNECTION_WORDS
+                    and len(next_sentences[0].split()) >= _MIN_CONNECTION_WORDS):
+                boundaries.append((current_sentences[-1], next_sentences[0]))
+            else:
+                boundaries.append(None)
+        
+        return boundaries
+    
+    def _analyze_paragraph_transitions(self, paragraphs: List[str],
+                                       boundary_pairs: List[Optional[Tuple[str, str]]],
+                                       embeddings: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
         """Analyze transitions between paragraphs."""
         transitions = []
         
-        for i in range(len(paragraphs) - 1):
-            current_para = paragraphs[i]
-            next_para = paragraphs[i + 1]
-            
+        for i, pair in enumerate(boundary_pairs):
             # Check for transition words
-            transition_type = self._identify_transition_type(next_para)
-            
-            # Analyze thematic connection
-            current_sentences = self._split_sentences(current_para)
-            next_sentences = self._split_sentences(next_para)
+            transition_type = self._identify_transition_type(paragraphs[i + 1])
             
-            if current_sentences and next_sentences:
-                # Get last sentence of current and first of next
+            # Analyze thematic connection between last sentence of current
+            # paragraph and first sentence of the next
+            if pair:
                 connection_strength = self._calculate_connection_strength(
-                    current_sentences[-1], 
-                    next_sentences[0]
+                    embeddings[pair[0]],
+                    embeddings[pair[1]]
                 )
             else:
                 connection_strength = 0.0
@@ -164,48 +341,49 @@ class CoherenceAnalyzer(BaseAnalyzer):
         return transitions
     
     def _identify_weak_connections(self, sentences: List[str], 
-                                 sentence_flow: List[float]) -> List[Dict[str, Any]]:
+                                 sentence_flow: np.ndarray) -> List[Dict[str, Any]]:
         """Identify weak connections in text flow."""
         weak_connections = []
         
         # Threshold for weak connection
         weak_threshold = 0.3
         
-        for i, similarity in enumerate(sentence_flow):
-            if similarity < weak_threshold:
-                weak_connections.append({
-                    'sentence_index': i,
-                    'similarity_score': similarity,
-                    'sentence_before': sentences[i][:100] + '...' if len(sentences[i]) > 100 else sentences[i],
-                    'sentence_after': sentences[i+1][:100] + '...' if len(sentences[i+1]) > 100 else sentences[i+1],
-                    'suggestion': self._suggest_connection_improvement(sentences[i], sentences[i+1])
-                })
+        # Content words per sentence, shared by neighbouring weak connections
+        content_words: Dict[int, frozenset] = {}
+        
+        # Filter in numpy; only the weak boundaries pay Python-level overhead
+        for i in np.flatnonzero(sentence_flow < weak_threshold).tolist():
+            before = sentences[i]
+            after = sentences[i + 1]
+            for j in (i, i + 1):
+                if j not in content_words:
+                    content_words[j] = frozenset(sentences[j].lower().split()) - _STOPWORDS
+            
+            weak_connections.append({
+                'sentence_index': i,
+                'similarity_score': float(sentence_flow[i]),
+                'sentence_before': before[:100] + '...' if len(before) > 100 else before,
+                'sentence_after': after[:100] + '...' if len(after) > 100 else after,
+                'suggestion': self._suggest_connection_improvement(
+                    after, content_words[i], content_words[i + 1]
+                )
+            })
         
         return weak_connections
     
     def _calculate_readability_metrics(self, text: str) -> Dict[str, float]:
         """Calculate various readability metrics."""
-        import textstat
-        
-        return {
-            'flesch_reading_ease': textstat.flesch_reading_ease(text),
-            'flesch_kincaid_grade': textstat.flesch_kincaid_grade(text),
-            'gunning_fog': textstat.gunning_fog(text),
-            'smog_index': textstat.smog_index(text),
-            'automated_readability_index': textstat.automated_readability_index(text),
-            'coleman_liau_index': textstat.coleman_liau_index(text),
-            'linsear_write_formula': textstat.linsear_write_formula(text),
-            'dale_chall_readability': textstat.dale_chall_readability_score(text)
-        }
+        # Copy so callers can't mutate the memoized result
+        return dict(readability_metrics(text))
     
-    def _calculate_coherence_score(self, sentence_flow: List[float],
+    def _calculate_coherence_score(self, sentence_flow: np.ndarray,
                                  paragraph_transitions: List[Dict[str, Any]],
                                  weak_connections: List[Dict[str, Any]],
                                  readability_scores: Dict[str, float]) -> float:
         """Calculate overall coherence score."""
         # Base score from sentence flow
-        if sentence_flow:
-            avg_flow = sum(sentence_flow) / len(sentence_flow)
+        if len(sentence_flow):
+            avg_flow = float(sentence_flow.mean())
             flow_score = avg_flow * 100
         else:
             flow_score = 100
@@ -228,11 +406,55 @@ class CoherenceAnalyzer(BaseAnalyzer):
         
         return max(0, min(100, score))
     
-    async def _get_api_feedback(self, text: str) -> Dict[str, Any]:
+    def _document_vector(self, sentences: List[str],
+                         embeddings: Dict[str, np.ndarray]) -> Optional[np.ndarray]:
+        """Unit-length mean of the sentence embeddings, or None without any."""
+        vectors = [embeddings[s] for s in sentences if s in embeddings]
+        if not vectors:
+            return None
+        
+        doc_vector = np.mean(vectors, axis=0, dtype=np.float32)
+        norm = np.linalg.norm(doc_vector)
+        return doc_vector / norm if norm > 0 else None
+    
+    async def _get_cached_api_feedback(self, text: str, doc_vector: Optional[np.ndarray],
+                                       api_request=None) -> Dict[str, Any]:
+        """Get API feedback, reusing a cached response for near-identical texts.
+        
+        Args:
+            text: Preprocessed text
+            doc_vector: Unit-length document embedding, or None
+            api_request: Optional CombinedRequest shared with the other analyzers
+            
+        Returns:
+            Parsed API feedback
+        """
+        if self.feedback_cache is None or doc_vector is None:
+            return await self._get_api_feedback(text, api_request)
+        
+        cached = self.feedback_cache.get(doc_vector)
+        if cached is not None:
+            # Leave coherence out of the shared Gemini request
+            if api_request is not None:
+                api_request.skip('coherence')
+            return cached
+        
+        feedback = await self._get_api_feedback(text, api_request)
+        if feedback:
+            await self.feedback_cache.set(doc_vector, feedback)
+        
+        return feedback
+    
+    async def _get_api_feedback(self, text: str, api_request=None) -> Dict[str, Any]:
         """Get coherence feedback from Gemini API."""
         if not self.gemini_service:
             return {}
         
+        if api_request is not None:
+            feedback = await api_request.section('coherence', text)
+            if feedback is not None:
+                return feedback
+        
         prompt = f"""Analyze the coherence and flow of the following text. 
         Provide feedback on:
         1. Overall logical flow and organization
@@ -259,7 +481,7 @@ class CoherenceAnalyzer(BaseAnalyzer):
             self.logger.error(f"Error getting API feedback: {e}")
             return {}
     
-    def _generate_suggestions(self, sentence_flow: List[float],
+    def _generate_suggestions(self, sentence_flow: np.ndarray,
                             paragraph_transitions: List[Dict[str, Any]],
                             weak_connections: List[Dict[str, Any]],
                             api_feedback: Dict[str, Any]) -> List[str]:
@@ -267,7 +489,7 @@ class CoherenceAnalyzer(BaseAnalyzer):
         suggestions = []
         
         # Based on sentence flow
-        if sentence_flow and sum(sentence_flow) / len(sentence_flow) < 0.4:
+        if len(sentence_flow) and sentence_flow.mean() < 0.4:
             suggestions.append("Consider using more transitional phrases to connect sentences")
         
         # Based on weak connections
@@ -292,44 +514,52 @@ class CoherenceAnalyzer(BaseAnalyzer):
     def _split_sentences(self, text: str) -> List[str]:
         """Split text into sentences."""
         # More sophisticated sentence splitting
-        sentences = re.split(r'(?<=[.!?])\s+(?=[A-Z])', text)
+        sentences = _SENT_SPLIT_RE.split(text)
         return [s.strip() for s in sentences if s.strip()]
     
     def _split_paragraphs(self, text: str) -> List[str]:
         """Split text into paragraphs."""
-        paragraphs = re.split(r'\n\s*\n', text)
+        paragraphs = _PARA_RE.split(text)
         return [p.strip() for p in paragraphs if p.strip()]
     
-    def _identify_transition_type(self, paragraph: str) -> str:
+    def _identify_transition_type(self, paragraph: str) -> Optional[str]:
         """Identify the type of transition used in a paragraph."""
-        paragraph_lower = paragraph.lower()
-        
-        for transition_type, words in self.transition_words.items():
-            for word in words:
-                if paragraph_lower.startswith(word) or f" {word}" in paragraph_lower[:50]:
-                    return transition_type
-        
-        return None
+        opening = paragraph[:50]
+        
+        # Most transitions are a single leading word
+        first_word = opening.split(None, 1)
+        if first_word:
+            transition_type = self._transition_first.get(first_word[0].rstrip(',;:').lower())
+            if transition_type:
+                return transition_type
+        
+        # Fall back to scanning the opening for multi-word or inline phrases
+        match = self._transition_re.search(opening)
+        return match.lastgroup if match else None
     
-    def _calculate_connection_strength(self, sentence1: str, sentence2: str) -> float:
-        """Calculate semantic connection strength between two sentences."""
-        embeddings = self.sentence_model.encode([sentence1, sentence2])
-        similarity = cosine_similarity(
-            embeddings[0].reshape(1, -1),
-            embeddings[1].reshape(1, -1)
-        )[0][0]
-        return float(similarity)
+    def _calculate_connection_strength(self, embedding1: np.ndarray,
+                                       embedding2: np.ndarray) -> float:
+        """Calculate semantic connection strength between two sentence embeddings."""
+        return float(int8_dot(embedding1, embedding2))
     
-    def _suggest_connection_improvement(self, sentence1: str, sentence2: str) -> str:
-        """Suggest how to improve connection between sentences."""
+    def _suggest_connection_improvement(self, sentence2: str, content_words1: frozenset,
+                                        content_words2: frozenset) -> str:
+        """Suggest how to improve connection between sentences.
+        
+        Args:
+            sentence2: The second sentence of the pair
+            content_words1: Lowercased non-stopword tokens of the first sentence
+            content_words2: Lowercased non-stopword tokens of the second sentence
+            
+        Returns:
+            Suggestion text
+        """
         # Simple heuristic-based suggestions
         if len(sentence2.split()) < 10:
             return "Consider expanding the second sentence or combining it with the previous one"
         
         # Check if sentences discuss completely different topics
-        words1 = set(sentence1.lower().split())
-        words2 = set(sentence2.lower().split())
-        common_words = words1.intersection(words2) - {'the', 'a', 'an', 'is', 'are', 'was', 'were'}
+        common_words = content_words1 & content_words2
         
         if len(common_words) < 2:
             return "Add a transitional sentence to bridge these topics"
@@ -338,17 +568,8 @@ class CoherenceAnalyzer(BaseAnalyzer):
     
     def _parse_api_feedback(self, response: str) -> Dict[str, Any]:
         """Parse API feedback response."""
-        import json
-        
         try:
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-            else:
-                return {}
+            return extract_json(response, dict)
         except Exception as e:
             self.logger.error(f"Failed to parse API feedback: {e}")
             return {}
\ No newline at end of file
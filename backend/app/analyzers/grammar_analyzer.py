@@ -1,49 +1,99 @@
 """Grammar analyzer using hybrid approach."""
 
-import spacy
-import language_tool_python
-from typing import Dict, Any, List, Optional
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+from functools import lru_cache
+from bisect import bisect_left, bisect_right
 import re
 import logging
 import os
 
 from app.analyzers.base_analyzer import BaseAnalyzer
+from app.analyzers.model_loader import DISABLED_RULES, get_language_tool, get_spacy_model
 from app.models.schemas import Error, ErrorType, Severity, GrammarScore
-from app.services.gemini_service import GeminiService
-from app.config import settings
+from app.services.gemini_service import get_gemini_service
+from app.utils.json_utils import extract_json
+from app.utils.lru_cache import LRUCache, text_key
+from app.utils.readability import readability_metrics
 
 logger = logging.getLogger(__name__)
 
+# Concurrent requests arriving within this window share one nlp.pipe call
+_PIPE_WINDOW = 0.01
+
+# Upper bound on texts per coalesced batch, and spaCy's inner batch size
+_PIPE_MAX_TEXTS = 256
+_PIPE_BATCH_SIZE = 64
+
+# Readability scores reported in grammar details
+_READABILITY_KEYS = (
+    "flesch_reading_ease",
+    "flesch_kincaid_grade",
+    "gunning_fog",
+    "automated_readability_index",
+    "coleman_liau_index"
+)
+
+# Score penalty per error, by severity
+_SEVERITY_WEIGHTS = {
+    Severity.LOW: 0.5,
+    Severity.MEDIUM: 1.0,
+    Severity.HIGH: 2.0,
+    Severity.CRITICAL: 3.0
+}
+
+@lru_cache(maxsize=None)
+def _map_lt_severity(category: str) -> Severity:
+    """Map LanguageTool category to severity; memoized per category."""
+    category_lower = category.lower()
+    
+    if 'typo' in category_lower or 'spelling' in category_lower:
+        return Severity.HIGH
+    elif 'grammar' in category_lower:
+        return Severity.MEDIUM
+    elif 'style' in category_lower:
+        return Severity.LOW
+    else:
+        return Severity.LOW
+
+@lru_cache(maxsize=None)
+def _map_lt_type(category: str) -> ErrorType:
+    """Map LanguageTool category to error type; memoized per category."""
+    category_lower = category.lower()
+    
+    if 'typo' in category_lower or 'spelling' in category_lower:
+        return ErrorType.SPELLING
+    elif 'grammar' in category_lower:
+        return ErrorType.GRAMMAR
+    elif 'punctuation' in category_lower:
+        return ErrorType.PUNCTUATION
+    elif 'style' in category_lower:
+        return ErrorType.STYLE
+    else:
+        return ErrorType.CLARITY
+
 class GrammarAnalyzer(BaseAnalyzer):
     """Analyzer for grammar, spelling, and style checking."""
     
     def __init__(self):
         super().__init__("GrammarAnalyzer")
         
-        # Initialize spaCy
-        try:
-            self.nlp = spacy.load(settings.spacy_model)
-        except OSError:
-            self.logger.warning(f"spaCy model {settings.spacy_model} not found. Downloading...")
-            import subprocess
-            subprocess.run(["python", "-m", "spacy", "download", settings.spacy_model])
-            self.nlp = spacy.load(settings.spacy_model)
-        
-        # Initialize LanguageTool
-        try:
-            self.language_tool = language_tool_python.LanguageTool('en-US')
-            logger.info("LanguageTool initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize LanguageTool: {str(e)}")
-            self.language_tool = None
+        # Shared spaCy pipeline and LanguageTool server, loaded once per process
+        self.nlp = get_spacy_model()
+        self.language_tool = get_language_tool()
+        
+        # Shared Gemini service
+        self.gemini_service = get_gemini_service()
         
-        # Initialize Gemini service
-        self.gemini_service = GeminiService() if settings.gemini_api_key else None
+        # Re-submitted texts skip LanguageTool, spaCy and the detail metrics
+        self._local_cache = LRUCache(maxsize=1024)
+        self._features_cache = LRUCache(maxsize=1024)
         
-        # Thread pool for CPU-bound operations
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        # spaCy batcher state, created lazily on the serving event loop
+        self._pipe_queue: Optional[asyncio.Queue] = None
+        self._pipe_loop: Optional[asyncio.AbstractEventLoop] = None
         
     async def analyze(self, text: str, use_api: bool = True, **kwargs) -> GrammarScore:
         """Analyze text for grammar errors.
@@ -51,68 +101,154 @@ class GrammarAnalyzer(BaseAnalyzer):
         Args:
             text: Text to analyze
             use_api: Whether to use Gemini API for advanced analysis
+            api_request: Optional CombinedRequest shared with the other analyzers
             
         Returns:
             GrammarScore object with analysis results
         """
         if not self.language_tool:
-            return GrammarScore(
-                score=0.0,
-                errors=[],
-                error_density=0.0,
-                suggestions=[],
-                details={
-                    "error_counts": {},
-                    "readability": {},
-                    "sentence_variety": {},
-                    "vocabulary_level": {}
-                }
-            )
+            return self._empty_score()
 
         # Preprocess text
         processed_text = self.preprocess_text(text)
         
-        # Get text statistics
-        stats = self.get_text_statistics(processed_text)
+        # Dispatch API analysis first so its round trip overlaps local work
+        api_task = None
+        if use_api and self._api_eligible(processed_text):
+            api_task = asyncio.create_task(
+                self._run_api_analysis(processed_text, kwargs.get('api_request'))
+            )
+        
+        # Don't leave the API task running if local analysis fails
+        try:
+            # Run local analysis
+            local = await self._analyze_local(processed_text)
+        except BaseException:
+            if api_task:
+                api_task.cancel()
+            raise
+        
+        # Collect API results once local analysis is done
+        api_errors = []
+        if api_task:
+            try:
+                api_errors = await api_task
+            except Exception as e:
+                self.logger.warning(f"API analysis failed: {e}")
         
-        # Run local analysis
-        local_errors = await self._run_local_analysis(processed_text)
+        return self._build_score(local, api_errors)
+    
+    async def analyze_local(self, text: str) -> Optional[Dict[str, Any]]:
+        """Run only the local, CPU-bound part of the analysis.
+        
+        Args:
+            text: Text to analyze
+            
+        Returns:
+            Picklable local results for complete(), or None without LanguageTool
+        """
+        if not self.language_tool:
+            return None
+        
+        return await self._analyze_local(self.preprocess_text(text))
+    
+    async def complete(self, local: Optional[Dict[str, Any]], api_request=None) -> GrammarScore:
+        """Add Gemini errors to the results of analyze_local().
+        
+        Args:
+            local: Result of analyze_local()
+            api_request: Optional CombinedRequest shared with the other analyzers
+            
+        Returns:
+            GrammarScore object with analysis results
+        """
+        if local is None:
+            return self._empty_score()
         
-        # Run API analysis if enabled and available
         api_errors = []
-        if use_api and self.gemini_service and len(processed_text) < 2000:
+        if self._api_eligible(local['text']):
             try:
-                api_errors = await self._run_api_analysis(processed_text)
+                api_errors = await self._run_api_analysis(local['text'], api_request)
             except Exception as e:
                 self.logger.warning(f"API analysis failed: {e}")
         
+        return self._build_score(local, api_errors)
+    
+    def _api_eligible(self, text: str) -> bool:
+        """Whether a text is sent to Gemini at all."""
+        return self.gemini_service is not None and len(text) < 2000
+    
+    def _empty_score(self) -> GrammarScore:
+        """Score returned when LanguageTool is unavailable."""
+        return GrammarScore(
+            score=0.0,
+            errors=[],
+            error_density=0.0,
+            suggestions=[],
+            details={
+                "error_counts": {},
+                "readability": {},
+                "sentence_variety": {},
+                "vocabulary_level": {}
+            }
+        )
+    
+    async def _analyze_local(self, processed_text: str) -> Dict[str, Any]:
+        """Collect the local errors and text features of a text.
+        
+        Args:
+            processed_text: Preprocessed text
+            
+        Returns:
+            Local results for _build_score()
+        """
+        return {
+            'text': processed_text,
+            'stats': self.get_text_statistics(processed_text),
+            'errors': await self._run_local_analysis(processed_text),
+            'features': self._compute_text_features(processed_text),
+            'readability': self._calculate_readability(processed_text)
+        }
+    
+    def _build_score(self, local: Dict[str, Any], api_errors: List[Error]) -> GrammarScore:
+        """Score the local results merged with the API errors."""
         # Merge and deduplicate errors
-        all_errors = self._merge_errors(local_errors, api_errors)
+        all_errors = self._merge_errors(local['errors'], api_errors)
+        word_count = local['stats']['word_count']
         
         # Calculate score
-        score = self._calculate_score(all_errors, stats['word_count'])
+        score = self._calculate_score(all_errors, word_count)
+        
+        # Count error types once for the details and the suggestions
+        error_counts = self._count_errors_by_type(all_errors)
         
         # Generate suggestions
-        suggestions = self._generate_suggestions(all_errors, processed_text)
+        features = local['features']
+        suggestions = self._generate_suggestions(all_errors, error_counts, features)
         
         # Create detailed analysis
         details = {
-            "error_counts": self._count_errors_by_type(all_errors),
-            "readability": self._calculate_readability(processed_text),
-            "sentence_variety": self._analyze_sentence_variety(processed_text),
-            "vocabulary_level": self._analyze_vocabulary(processed_text)
+            "error_counts": error_counts,
+            "readability": local['readability'],
+            "sentence_variety": self._analyze_sentence_variety(features),
+            "vocabulary_level": self._analyze_vocabulary(features)
         }
         
         return GrammarScore(
             score=score,
             errors=all_errors,
-            error_density=len(all_errors) / max(stats['word_count'], 1) * 100,
+            error_density=len(all_errors) / max(word_count, 1) * 100,
             suggestions=suggestions,
             details=details
         )
     
     async def _run_local_analysis(self, text: str) -> List[Error]:
         """Run local grammar analysis using spaCy and LanguageTool."""
+        key = text_key(text)
+        cached = self._local_cache.get(key)
+        if cached is not None:
+            return list(cached)
+        
         errors = []
         
         # LanguageTool analysis
@@ -124,12 +260,12 @@ class GrammarAnalyzer(BaseAnalyzer):
         )
         
         for match in lt_matches:
-            # Skip certain rule IDs that are too pedantic
-            if match.ruleId in ['WHITESPACE_RULE', 'EN_QUOTES', 'COMMA_PARENTHESIS_WHITESPACE']:
+            # Disabled server-side; kept as a guard for servers that ignore it
+            if match.ruleId in DISABLED_RULES:
                 continue
                 
-            severity = self._map_lt_severity(match.category)
-            error_type = self._map_lt_type(match.category)
+            severity = _map_lt_severity(match.category)
+            error_type = _map_lt_type(match.category)
             
             errors.append(Error(
                 type=error_type,
@@ -142,7 +278,7 @@ class GrammarAnalyzer(BaseAnalyzer):
             ))
         
         # spaCy analysis for additional checks
-        doc = await loop.run_in_executor(self.executor, self.nlp, text)
+        doc = await self._pipe_one(text)
         
         # Check for sentence fragments
         for sent in doc.sents:
@@ -156,9 +292,66 @@ class GrammarAnalyzer(BaseAnalyzer):
                     confidence=0.6
                 ))
         
-        return errors
+        self._local_cache.set(key, errors)
+        return list(errors)
+    
+    async def _pipe_one(self, text: str):
+        """Parse a text with spaCy via the shared request batcher.
+        
+        Args:
+            text: Text to parse
+            
+        Returns:
+            Parsed spaCy Doc
+        """
+        loop = asyncio.get_running_loop()
+        if self._pipe_queue is None or self._pipe_loop is not loop:
+            self._pipe_queue = asyncio.Queue()
+            self._pipe_loop = loop
+            loop.create_task(self._pipe_batches(self._pipe_queue))
+        
+        future = loop.create_future()
+        await self._pipe_queue.put((text, future))
+        return await future
+    
+    async def _pipe_batches(self, queue: asyncio.Queue):
+        """Drain queued texts and parse each batch with a single nlp.pipe call."""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await queue.get()]
+            
+            # Give concurrent requests a moment to join the batch
+            await asyncio.sleep(_PIPE_WINDOW)
+            while not queue.empty() and len(batch) < _PIPE_MAX_TEXTS:
+                batch.append(queue.get_nowait())
+            
+            try:
+                docs = await loop.run_in_executor(
+                    self.executor,
+                    self._pipe_texts,
+                    [text for text, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), doc in zip(batch, docs):
+                if not future.done():
+                    future.set_result(doc)
+    
+    def _pipe_texts(self, texts: List[str]) -> list:
+        """Run spaCy over a batch of texts.
+        
+        Always in this thread: nlp.pipe(n_process=...) would fork fresh
+        processes per call from a process with torch and LanguageTool
+        threads running. Multi-core batches go through AnalysisRunner.
+        """
+        return list(self.nlp.pipe(texts, batch_size=_PIPE_BATCH_SIZE))
     
-    async def _run_api_analysis(self, text: str) -> List[Error]:
+    async def _run_api_analysis(self, text: str, api_request=None) -> List[Error]:
         """Run advanced grammar analysis using Gemini API."""
         if not self.gemini_service:
             return []
@@ -184,8 +377,12 @@ class GrammarAnalyzer(BaseAnalyzer):
         """
         
         try:
-            response = await self.gemini_service.analyze_text(prompt)
-            errors_data = self._parse_api_response(response)
+            errors_data = None
+            if api_request is not None:
+                errors_data = await api_request.section('grammar', text)
+            if errors_data is None:
+                response = await self.gemini_service.analyze_text(prompt)
+                errors_data = self._parse_api_response(response)
             
             return [
                 Error(
@@ -208,24 +405,33 @@ class GrammarAnalyzer(BaseAnalyzer):
         all_errors = []
         seen_positions = set()
         
+        # Accepted spans ordered by start, so overlap checks only look at
+        # spans starting within 5 characters of the candidate
+        starts: List[int] = []
+        ends: List[int] = []
+        
+        def accept(error: Error):
+            start, end = error.position[0], error.position[1]
+            idx = bisect_right(starts, start)
+            starts.insert(idx, start)
+            ends.insert(idx, end)
+            all_errors.append(error)
+        
         # Prioritize API errors (higher confidence)
         for error in api_errors:
             pos_key = (error.position[0], error.position[1], error.type)
             if pos_key not in seen_positions:
-                all_errors.append(error)
+                accept(error)
                 seen_positions.add(pos_key)
         
-        # Add local errors that don't overlap
+        # Add local errors that don't overlap; an identical span always
+        # overlaps, so this also drops exact duplicates
         for error in local_errors:
-            pos_key = (error.position[0], error.position[1], error.type)
-            overlap = any(
-                abs(error.position[0] - e.position[0]) < 5 and 
-                abs(error.position[1] - e.position[1]) < 5
-                for e in all_errors
-            )
-            if not overlap and pos_key not in seen_positions:
-                all_errors.append(error)
-                seen_positions.add(pos_key)
+            start, end = error.position[0], error.position[1]
+            lo = bisect_right(starts, start - 5)
+            hi = bisect_left(starts, start + 5)
+            if not any(abs(end - ends[j]) < 5 for j in range(lo, hi)):
+                accept(error)
         
         # Sort by position
         all_errors.sort(key=lambda e: e.position[0])
@@ -237,17 +443,11 @@ class GrammarAnalyzer(BaseAnalyzer):
         if word_count == 0:
             return 100.0
         
-        # Weight errors by severity
-        severity_weights = {
-            Severity.LOW: 0.5,
-            Severity.MEDIUM: 1.0,
-            Severity.HIGH: 2.0,
-            Severity.CRITICAL: 3.0
-        }
-        
+        # Weight errors by severity; one weight lookup per severity level
+        severity_counts = Counter(error.severity for error in errors)
         total_penalty = sum(
-            severity_weights.get(error.severity, 1.0) 
-            for error in errors
+            _SEVERITY_WEIGHTS.get(severity, 1.0) * count
+            for severity, count in severity_counts.items()
         )
         
         # Calculate score (deduct points for errors, but not below 0)
@@ -259,111 +459,103 @@ class GrammarAnalyzer(BaseAnalyzer):
         
         return round(score, 2)
     
-    def _generate_suggestions(self, errors: List[Error], text: str) -> List[str]:
+    def _generate_suggestions(self, errors: List[Error], error_counts: Dict[str, int],
+                              features: Dict[str, Any]) -> List[str]:
         """Generate overall suggestions based on errors."""
         suggestions = []
         
-        error_types = [e.type for e in errors]
-        
-        if ErrorType.GRAMMAR in error_types:
+        if error_counts[ErrorType.GRAMMAR.value]:
             suggestions.append("Review sentence structure and ensure subject-verb agreement")
         
-        if ErrorType.SPELLING in error_types:
+        if error_counts[ErrorType.SPELLING.value]:
             suggestions.append("Use spell-check and proofread carefully for typos")
         
-        if ErrorType.PUNCTUATION in error_types:
+        if error_counts[ErrorType.PUNCTUATION.value]:
             suggestions.append("Check punctuation, especially comma usage and sentence endings")
         
-        if ErrorType.STYLE in error_types:
+        if error_counts[ErrorType.STYLE.value]:
             suggestions.append("Consider varying sentence structure for better flow")
         
-        if ErrorType.CLARITY in error_types:
+        if error_counts[ErrorType.CLARITY.value]:
             suggestions.append("Simplify complex sentences for better readability")
         
         # Add specific suggestions based on error patterns
         if len(errors) > 10:
             suggestions.append("Consider breaking down complex ideas into simpler sentences")
         
-        avg_sentence_length = len(text.split()) / max(len(text.split('.')), 1)
+        avg_sentence_length = len(features["words"]) / max(features["period_count"] + 1, 1)
         if avg_sentence_length > 25:
             suggestions.append("Try using shorter sentences to improve readability")
         
         return suggestions[:5]  # Return top 5 suggestions
     
-    def _map_lt_severity(self, category: str) -> Severity:
-        """Map LanguageTool category to severity."""
-        category_lower = category.lower()
-        
-        if 'typo' in category_lower or 'spelling' in category_lower:
-            return Severity.HIGH
-        elif 'grammar' in category_lower:
-            return Severity.MEDIUM
-        elif 'style' in category_lower:
-            return Severity.LOW
-        else:
-            return Severity.LOW
-    
-    def _map_lt_type(self, category: str) -> ErrorType:
-        """Map LanguageTool category to error type."""
-        category_lower = category.lower()
-        
-        if 'typo' in category_lower or 'spelling' in category_lower:
-            return ErrorType.SPELLING
-        elif 'grammar' in category_lower:
-            return ErrorType.GRAMMAR
-        elif 'punctuation' in category_lower:
-            return ErrorType.PUNCTUATION
-        elif 'style' in category_lower:
-            return ErrorType.STYLE
-        else:
-            return ErrorType.CLARITY
-    
     def _count_errors_by_type(self, errors: List[Error]) -> Dict[str, int]:
         """Count errors by type."""
-        counts = {error_type.value: 0 for error_type in ErrorType}
-        for error in errors:
-            counts[error.type.value] += 1
+        counts = dict.fromkeys((error_type.value for error_type in ErrorType), 0)
+        counts.update(Counter(error.type.value for error in errors))
         return counts
     
-    def _calculate_readability(self, text: str) -> Dict[str, float]:
-        """Calculate various readability scores."""
-        import textstat
+    def _compute_text_features(self, text: str) -> Dict[str, Any]:
+        """Tokenize the text once for the variety, vocabulary and suggestion checks.
         
-        return {
-            "flesch_reading_ease": textstat.flesch_reading_ease(text),
-            "flesch_kincaid_grade": textstat.flesch_kincaid_grade(text),
-            "gunning_fog": textstat.gunning_fog(text),
-            "automated_readability_index": textstat.automated_readability_index(text),
-            "coleman_liau_index": textstat.coleman_liau_index(text)
+        Args:
+            text: Preprocessed text
+            
+        Returns:
+            Dictionary with per-sentence word counts and starters, the
+            lowercased words, and the number of periods; cached per text
+        """
+        key = text_key(text)
+        features = self._features_cache.get(key)
+        if features is not None:
+            return features
+        
+        sentence_lengths = []
+        starters = []
+        for sentence in self._split_sentences(text):
+            tokens = sentence.split()
+            sentence_lengths.append(len(tokens))
+            starters.append(tokens[0].lower() if tokens else "")
+        
+        features = {
+            "sentence_lengths": np.asarray(sentence_lengths, dtype=np.float64),
+            "starters": starters,
+            "words": text.lower().split(),
+            "period_count": text.count('.')
         }
+        self._features_cache.set(key, features)
+        return features
     
-    def _analyze_sentence_variety(self, text: str) -> Dict[str, Any]:
+    def _calculate_readability(self, text: str) -> Dict[str, float]:
+        """Calculate various readability scores."""
+        # Shared with the coherence analyzer, which scores the same text
+        metrics = readability_metrics(text)
+        return {key: metrics[key] for key in _READABILITY_KEYS}
+    
+    def _analyze_sentence_variety(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze sentence variety and structure."""
-        sentences = self._split_sentences(text)
-        if not sentences:
+        lengths = features["sentence_lengths"]
+        if not lengths.size:
             return {"variety_score": 0, "patterns": {}}
         
-        # Analyze sentence lengths
-        lengths = [len(s.split()) for s in sentences]
-        
         # Analyze sentence starters
-        starters = [s.split()[0].lower() if s.split() else "" for s in sentences]
+        starters = features["starters"]
         starter_variety = len(set(starters)) / len(starters) if starters else 0
         
         return {
             "variety_score": starter_variety * 100,
-            "avg_length": sum(lengths) / len(lengths) if lengths else 0,
-            "length_variance": self._calculate_variance(lengths),
+            "avg_length": float(lengths.mean()),
+            "length_variance": float(lengths.var()),
             "patterns": {
-                "short_sentences": sum(1 for l in lengths if l < 10),
-                "medium_sentences": sum(1 for l in lengths if 10 <= l < 20),
-                "long_sentences": sum(1 for l in lengths if l >= 20)
+                "short_sentences": int((lengths < 10).sum()),
+                "medium_sentences": int(((lengths >= 10) & (lengths < 20)).sum()),
+                "long_sentences": int((lengths >= 20).sum())
             }
         }
     
-    def _analyze_vocabulary(self, text: str) -> Dict[str, Any]:
+    def _analyze_vocabulary(self, features: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze vocabulary complexity and diversity."""
-        words = text.lower().split()
+        words = features["words"]
         unique_words = set(words)
         
         # Simple vocabulary analysis
@@ -374,27 +566,11 @@ class GrammarAnalyzer(BaseAnalyzer):
             "avg_word_length": sum(len(w) for w in words) / len(words) if words else 0
         }
     
-    def _calculate_variance(self, values: List[float]) -> float:
-        """Calculate variance of a list of values."""
-        if not values:
-            return 0
-        mean = sum(values) / len(values)
-        return sum((x - mean) ** 2 for x in values) / len(values)
-    
     def _parse_api_response(self, response: str) -> List[Dict[str, Any]]:
         """Parse API response to extract errors."""
-        import json
-        
         try:
-            # Extract JSON from response
-            json_start = response.find('[')
-            json_end = response.rfind(']') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-            else:
-                return []
+            # Extract JSON from response; a truncated array keeps its valid prefix
+            return extract_json(response, list)
         except Exception as e:
             self.logger.error(f"Failed to parse API response: {e}")
             return []
\ No newline at end of file
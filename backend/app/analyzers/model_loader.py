@@ -0,0 +1,88 @@
+"""Process-wide singletons for the heavy NLP models."""
+
+import logging
+import subprocess
+import sys
+from functools import lru_cache
+from typing import Optional
+
+import language_tool_python
+import spacy
+import torch
+from sentence_transformers import SentenceTransformer
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Only the parser is needed (sentence bounds and ROOT dependencies)
+SPACY_DISABLE = ["tagger", "attribute_ruler", "lemmatizer", "ner"]
+
+# LanguageTool rules too pedantic to report; disabled so the server never runs them
+DISABLED_RULES = frozenset({'WHITESPACE_RULE', 'EN_QUOTES', 'COMMA_PARENTHESIS_WHITESPACE'})
+
+@lru_cache(maxsize=None)
+def get_spacy_model():
+    """Load the spaCy pipeline once per process.
+    
+    Returns:
+        spaCy Language with only the parser enabled
+    """
+    try:
+        return spacy.load(settings.spacy_model, disable=SPACY_DISABLE)
+    except OSError:
+        logger.warning(f"spaCy model {settings.spacy_model} not found. Downloading...")
+        subprocess.run([sys.executable, "-m", "spacy", "download", settings.spacy_model])
+        return spacy.load(settings.spacy_model, disable=SPACY_DISABLE)
+
+@lru_cache(maxsize=None)
+def get_sentence_model() -> SentenceTransformer:
+    """Load the sentence transformer once per process.
+    
+    Returns:
+        SentenceTransformer shared by the coherence and relevance analyzers
+    """
+    model = SentenceTransformer(
+        settings.embedding_model,
+        backend=settings.embedding_backend,
+        model_kwargs=(
+            {"file_name": settings.embedding_onnx_file}
+            if settings.embedding_onnx_file else None
+        )
+    )
+    
+    # Half precision on GPU halves activation traffic; embeddings are
+    # normalized and compared against coarse thresholds, so the loss is moot
+    if settings.embedding_backend == "torch" and model.device.type == "cuda":
+        model.half()
+    
+    # int8 weights for the transformer's Linear layers; for a fully int8 graph
+    # use the ONNX backend with a quantized export instead
+    elif settings.embedding_backend == "torch" and settings.embedding_quantize:
+        model[0].auto_model = torch.quantization.quantize_dynamic(
+            model[0].auto_model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    
+    return model
+
+@lru_cache(maxsize=None)
+def get_language_tool() -> Optional[language_tool_python.LanguageTool]:
+    """Start LanguageTool once per process.
+    
+    When a LanguageTool server URL is configured, checks go over HTTP to
+    that shared server instead of a JVM spawned by every worker process.
+    
+    Returns:
+        LanguageTool instance, or None if it could not be started
+    """
+    try:
+        tool = language_tool_python.LanguageTool(
+            'en-US',
+            remote_server=settings.languagetool_server_url
+        )
+        tool.disabled_rules.update(DISABLED_RULES)
+        logger.info("LanguageTool initialized successfully")
+        return tool
+    except Exception as e:
+        logger.error(f"Failed to initialize LanguageTool: {str(e)}")
+        return None
\ No newline at end of file
@@ -1,57 +1,86 @@
 """Topic relevance analyzer for text analysis."""
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import re
 import nltk
 from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
 from collections import Counter
 
 from app.analyzers.base_analyzer import BaseAnalyzer
+from app.analyzers.model_loader import get_sentence_model
 from app.models.schemas import RelevanceScore
-from app.services.gemini_service import GeminiService
+from app.services.gemini_service import get_gemini_service
+from app.services.semantic_cache import SemanticCache
+from app.utils.embedding_cache import CachedEncoder
+from app.utils.json_utils import extract_json
+from app.utils.lru_cache import LRUCache, text_key
 from app.config import settings
 
 # Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
 try:
     nltk.data.find('corpora/stopwords')
 except LookupError:
     nltk.download('stopwords')
 
+# Paragraph boundary: a blank line
+_PARA_RE = re.compile(r'\n\s*\n')
+
+# Candidate key terms: alphanumeric tokens of at least three characters
+_TERM_RE = re.compile(r'[a-z][a-z0-9]{2,}')
+
+# English stop words, excluded from key terms
+_STOPWORDS = frozenset(stopwords.words('english'))
+
+# Common aspects to check based on topic keywords
+_ASPECT_KEYWORDS = {
+    'technical': ['implementation', 'architecture', 'performance', 'scalability'],
+    'business': ['roi', 'cost', 'benefit', 'strategy', 'market'],
+    'research': ['methodology', 'results', 'conclusion', 'hypothesis', 'data'],
+    'educational': ['examples', 'explanation', 'definition', 'practice', 'theory'],
+    'analysis': ['comparison', 'evaluation', 'metrics', 'findings', 'insights']
+}
+
+# Every aspect in one alternation; the lookahead also reports overlapping hits
+_ASPECT_RE = re.compile(
+    '(?=(' + '|'.join(
+        re.escape(aspect)
+        for aspects in _ASPECT_KEYWORDS.values()
+        for aspect in aspects
+    ) + '))'
+)
+
 class RelevanceAnalyzer(BaseAnalyzer):
     """Analyzer for topic relevance and coverage."""
     
     def __init__(self):
         super().__init__("RelevanceAnalyzer")
         
-        # Initialize sentence transformer
-        self.sentence_model = SentenceTransformer(settings.embedding_model)
+        # Shared sentence transformer, loaded once per process
+        self.sentence_model = get_sentence_model()
         
-        # Initialize TF-IDF vectorizer
-        self.tfidf_vectorizer = TfidfVectorizer(
-            max_features=1000,
-            stop_words='english',
-            ngram_range=(1, 2)
+        # Batched, cached encoder; topics in particular repeat across submissions
+        self.encoder = CachedEncoder(
+            self.sentence_model,
+            maxsize=1024,
+            batch_size=settings.embedding_batch_size
         )
         
-        # Initialize Gemini service
-        self.gemini_service = GeminiService() if settings.gemini_api_key else None
+        # Key terms of re-submitted texts
+        self._key_terms_cache = LRUCache(maxsize=1024)
         
-        # Thread pool for CPU-bound operations
-        self.executor = ThreadPoolExecutor(max_workers=4)
+        # Shared Gemini service
+        self.gemini_service = get_gemini_service()
         
-        # Stop words
-        self.stop_words = set(stopwords.words('english'))
+        # Paraphrased texts on the same topics reuse earlier Gemini analyses
+        self.analysis_cache = None
+        if self.gemini_service and settings.cache_enabled:
+            model_id = settings.embedding_model.replace('/', '--')
+            self.analysis_cache = SemanticCache(
+                settings.cache_dir / "semantic" / f"relevance-{model_id}",
+                threshold=settings.relevance_cache_threshold
+            )
     
     async def analyze(self, text: str, topic: Optional[str] = None, 
                      topics: Optional[List[str]] = None, use_api: bool = True, 
@@ -63,6 +92,7 @@ class RelevanceAnalyzer(BaseAnalyzer):
             topic: Single topic string
             topics: List of topics
             use_api: Whether to use Gemini API
+            api_request: Optional CombinedRequest shared with the other analyzers
             
         Returns:
             RelevanceScore object with analysis results
@@ -70,219 +100,339 @@ class RelevanceAnalyzer(BaseAnalyzer):
         # Preprocess text
         processed_text = self.preprocess_text(text)
         
-        # Handle topic input
+        all_topics = self._all_topics(topic, topics)
+        if not all_topics:
+            return self._neutral_score()
+        
+        # Dispatch the API call as soon as the text embedding is ready so its
+        # round trip overlaps the rest of the local work
+        text_embedding = asyncio.get_running_loop().create_future()
+        api_task = None
+        if use_api and self._api_eligible(processed_text):
+            async def api_analysis():
+                # Only the semantic cache lookup has to wait for the embedding
+                vector = await text_embedding if self.analysis_cache is not None else None
+                return await self._get_cached_api_analysis(
+                    processed_text, all_topics, vector, kwargs.get('api_request')
+                )
+            api_task = asyncio.create_task(api_analysis())
+        
+        # Don't leave the API task running if local analysis fails
+        try:
+            local = await self._analyze_local(processed_text, all_topics, text_embedding)
+        except BaseException:
+            if api_task:
+                api_task.cancel()
+            raise
+        
+        # Collect API analysis once local work is done
+        api_analysis = None
+        if api_task:
+            try:
+                api_analysis = await api_task
+            except Exception as e:
+                self.logger.warning(f"API analysis failed: {e}")
+        
+        return self._build_score(local, api_analysis)
+    
+    async def analyze_local(self, text: str, topic: Optional[str] = None,
+                            topics: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Run only the local, CPU-bound part of the analysis.
+        
+        Args:
+            text: Text to analyze
+            topic: Single topic string
+            topics: List of topics
+            
+        Returns:
+            Picklable local results for complete(), or None without topics
+        """
+        all_topics = self._all_topics(topic, topics)
+        if not all_topics:
+            return None
+        
+        return await self._analyze_local(self.preprocess_text(text), all_topics)
+    
+    async def complete(self, local: Optional[Dict[str, Any]], api_request=None) -> RelevanceScore:
+        """Add Gemini analysis to the results of analyze_local().
+        
+        Args:
+            local: Result of analyze_local()
+            api_request: Optional CombinedRequest shared with the other analyzers
+            
+        Returns:
+            RelevanceScore object with analysis results
+        """
+        if local is None:
+            return self._neutral_score()
+        
+        api_analysis = None
+        if self._api_eligible(local['text']):
+            try:
+                api_analysis = await self._get_cached_api_analysis(
+                    local['text'], local['topics'], local['text_embedding'], api_request
+                )
+            except Exception as e:
+                self.logger.warning(f"API analysis failed: {e}")
+        
+        return self._build_score(local, api_analysis)
+    
+    def _all_topics(self, topic: Optional[str], topics: Optional[List[str]]) -> List[str]:
+        """Combine the single topic and the topic list."""
         all_topics = []
         if topic:
             all_topics.append(topic)
         if topics:
             all_topics.extend(topics)
+        return all_topics
+    
+    def _api_eligible(self, text: str) -> bool:
+        """Whether a text is sent to Gemini at all."""
+        return self.gemini_service is not None and len(text) < 2000
+    
+    def _neutral_score(self) -> RelevanceScore:
+        """Score returned when no topic is given."""
+        return RelevanceScore(
+            score=50.0,
+            topic_coverage={},
+            key_terms_found=[],
+            missing_aspects=[],
+            topic_drift=[],
+            suggestions=["Please provide a topic to analyze relevance against"]
+        )
+    
+    async def _analyze_local(self, processed_text: str, all_topics: List[str],
+                             text_embedding: Optional["asyncio.Future"] = None) -> Dict[str, Any]:
+        """Compute the coverage, drift and key term results of a text.
         
-        if not all_topics:
-            # If no topic provided, return neutral score
-            return RelevanceScore(
-                score=50.0,
-                topic_coverage={},
-                key_terms_found=[],
-                missing_aspects=[],
-                topic_drift=[],
-                suggestions=["Please provide a topic to analyze relevance against"]
+        Args:
+            processed_text: Preprocessed text
+            all_topics: Topics to check relevance against
+            text_embedding: Optional future resolved with the text embedding
+                as soon as the text is encoded
+            
+        Returns:
+            Local results, including the text embedding
+        """
+        # Paragraphs checked for topic drift
+        drift_candidates = self._drift_candidates(processed_text)
+        
+        # Encode text, drift candidates and topics in one executor submission
+        encode_task = asyncio.ensure_future(
+            self._encode(
+                [processed_text]
+                + [paragraph for _, paragraph in drift_candidates]
+                + all_topics
             )
+        )
         
-        # Extract key terms from text
-        key_terms = await self._extract_key_terms(processed_text)
+        # Key term extraction runs concurrently with the encoding
+        key_terms_task = asyncio.ensure_future(self._extract_key_terms(processed_text))
+        try:
+            embeddings = await encode_task
+        except BaseException:
+            key_terms_task.cancel()
+            raise
         
-        # Calculate topic coverage
-        topic_coverage = await self._calculate_topic_coverage(processed_text, all_topics)
+        # Release the API call before waiting on the key terms
+        if text_embedding is not None:
+            text_embedding.set_result(embeddings[0])
+        key_terms = await key_terms_task
         
-        # Find missing aspects
-        missing_aspects = await self._identify_missing_aspects(processed_text, all_topics, key_terms)
+        para_embeddings = embeddings[1:1 + len(drift_candidates)]
+        topic_embeddings = embeddings[1 + len(drift_candidates):]
+        
+        # Calculate topic coverage
+        topic_coverage = self._calculate_topic_coverage(all_topics, embeddings[0], topic_embeddings)
         
         # Analyze topic drift
-        topic_drift = await self._analyze_topic_drift(processed_text, all_topics)
+        topic_drift = self._analyze_topic_drift(drift_candidates, para_embeddings, topic_embeddings)
         
-        # Use API for advanced analysis if available
-        api_analysis = None
-        if use_api and self.gemini_service and len(processed_text) < 2000:
-            try:
-                api_analysis = await self._get_api_analysis(processed_text, all_topics)
-            except Exception as e:
-                self.logger.warning(f"API analysis failed: {e}")
+        # Find missing aspects
+        missing_aspects = await self._identify_missing_aspects(processed_text, all_topics, key_terms)
         
+        return {
+            'text': processed_text,
+            'topics': all_topics,
+            'text_embedding': embeddings[0],
+            'topic_coverage': topic_coverage,
+            'key_terms': key_terms,
+            'topic_drift': topic_drift,
+            'missing_aspects': missing_aspects
+        }
+    
+    def _build_score(self, local: Dict[str, Any],
+                     api_analysis: Optional[Dict[str, Any]]) -> RelevanceScore:
+        """Score the local results and merge in the API analysis."""
         # Calculate final score
         score = self._calculate_relevance_score(
-            topic_coverage,
-            key_terms,
-            topic_drift,
+            local['topic_coverage'],
+            local['key_terms'],
+            local['topic_drift'],
             api_analysis
         )
         
         # Generate suggestions
         suggestions = self._generate_suggestions(
-            topic_coverage,
-            missing_aspects,
-            topic_drift,
+            local['topic_coverage'],
+            local['missing_aspects'],
+            local['topic_drift'],
             api_analysis
         )
         
         return RelevanceScore(
             score=score,
-            topic_coverage=topic_coverage,
-            key_terms_found=key_terms[:20],  # Top 20 key terms
-            missing_aspects=missing_aspects,
-            topic_drift=topic_drift,
+            topic_coverage=local['topic_coverage'],
+            key_terms_found=local['key_terms'][:20],  # Top 20 key terms
+            missing_aspects=local['missing_aspects'],
+            topic_drift=local['topic_drift'],
             suggestions=suggestions
         )
     
     async def _extract_key_terms(self, text: str) -> List[str]:
-        """Extract key terms from text using TF-IDF."""
-        loop = asyncio.get_event_loop()
-        
-        # Tokenize and filter
-        tokens = word_tokenize(text.lower())
+        """Extract key terms from text, cached per text."""
+        key = text_key(text)
+        key_terms = self._key_terms_cache.get(key)
+        if key_terms is None:
+            key_terms = self._compute_key_terms(text)
+            self._key_terms_cache.set(key, key_terms)
+        return list(key_terms)
+    
+    def _compute_key_terms(self, text: str) -> List[str]:
+        """Extract the most frequent non-stopword terms from text."""
+        # Tokenize and filter in one regex pass
         filtered_tokens = [
-            token for token in tokens 
-            if token.isalnum() and token not in self.stop_words and len(token) > 2
+            token for token in _TERM_RE.findall(text.lower())
+            if token not in _STOPWORDS
         ]
         
-        # If text is too short, return most common words
-        if len(filtered_tokens) < 20:
-            return list(Counter(filtered_tokens).most_common(10))
-        
-        try:
-            # Fit TF-IDF on the text
-            tfidf_matrix = await loop.run_in_executor(
-                self.executor,
-                self.tfidf_vectorizer.fit_transform,
-                [text]
-            )
-            
-            # Get feature names and scores
-            feature_names = self.tfidf_vectorizer.get_feature_names_out()
-            scores = tfidf_matrix.toarray()[0]
-            
-            # Sort by score
-            term_scores = [(feature_names[i], scores[i]) for i in range(len(scores))]
-            term_scores.sort(key=lambda x: x[1], reverse=True)
-            
-            return [term for term, score in term_scores if score > 0]
-        except Exception as e:
-            self.logger.error(f"Error extracting key terms: {e}")
-            # Fallback to simple frequency-based extraction
-            return [word for word, _ in Counter(filtered_tokens).most_common(20)]
+        # TF-IDF fitted on a single document ranks terms by frequency alone,
+        # so count directly instead of building and densifying a matrix
+        return [term for term, _ in Counter(filtered_tokens).most_common(20)]
     
-    async def _calculate_topic_coverage(self, text: str, topics: List[str]) -> Dict[str, float]:
-        """Calculate how well the text covers each topic."""
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts with a single executor submission."""
         loop = asyncio.get_event_loop()
-        
-        # Get embeddings for text and topics
-        text_embedding = await loop.run_in_executor(
-            self.executor,
-            self.sentence_model.encode,
-            [text]
-        )
-        
-        topic_embeddings = await loop.run_in_executor(
+        return await loop.run_in_executor(
             self.executor,
-            self.sentence_model.encode,
-            topics
+            self.encoder.encode,
+            texts
         )
+    
+    def _calculate_topic_coverage(self, topics: List[str], text_embedding: np.ndarray,
+                                  topic_embeddings: np.ndarray) -> Dict[str, float]:
+        """Calculate how well the text covers each topic."""
+        # Embeddings are unit length, so dot products are cosine similarities
+        similarities = topic_embeddings @ text_embedding
         
-        # Calculate similarities
-        coverage = {}
-        for i, topic in enumerate(topics):
-            similarity = cosine_similarity(
-                text_embedding[0].reshape(1, -1),
-                topic_embeddings[i].reshape(1, -1)
-            )[0][0]
-            coverage[topic] = float(similarity) * 100
-        
-        return coverage
+        return {
+            topic: float(similarity) * 100
+            for topic, similarity in zip(topics, similarities.tolist())
+        }
     
     async def _identify_missing_aspects(self, text: str, topics: List[str], 
                                       key_terms: List[str]) -> List[str]:
         """Identify aspects of the topic that might be missing."""
         missing_aspects = []
         
-        # Common aspects to check based on topic keywords
-        aspect_keywords = {
-            'technical': ['implementation', 'architecture', 'performance', 'scalability'],
-            'business': ['roi', 'cost', 'benefit', 'strategy', 'market'],
-            'research': ['methodology', 'results', 'conclusion', 'hypothesis', 'data'],
-            'educational': ['examples', 'explanation', 'definition', 'practice', 'theory'],
-            'analysis': ['comparison', 'evaluation', 'metrics', 'findings', 'insights']
-        }
+        # Find every aspect mentioned in the text with a single scan
+        covered = set(_ASPECT_RE.findall(text.lower()))
+        covered.update(key_terms)
         
         # Determine topic type and check for missing aspects
-        text_lower = text.lower()
         for topic in topics:
             topic_lower = topic.lower()
             
             # Check which aspect category the topic might belong to
-            for category, aspects in aspect_keywords.items():
-                if any(keyword in topic_lower for keyword in [category]):
+            for category, aspects in _ASPECT_KEYWORDS.items():
+                if category in topic_lower:
                     for aspect in aspects:
-                        if aspect not in text_lower and aspect not in key_terms:
+                        if aspect not in covered:
                             missing_aspects.append(f"{aspect} related to {topic}")
         
         # Limit to top 5 missing aspects
         return missing_aspects[:5]
     
-    async def _analyze_topic_drift(self, text: str, topics: List[str]) -> List[Dict[str, Any]]:
-        """Analyze how the text drifts from the main topics."""
+    def _drift_candidates(self, text: str) -> List[Tuple[int, str]]:
+        """Get the (index, paragraph) pairs checked for topic drift."""
         # Split text into chunks (paragraphs or sections)
         paragraphs = self._split_paragraphs(text)
         
         if len(paragraphs) < 2:
             return []
         
-        loop = asyncio.get_event_loop()
+        # Skip very short paragraphs
+        return [
+            (i, paragraph) for i, paragraph in enumerate(paragraphs)
+            if len(paragraph.strip()) >= 50
+        ]
+    
+    def _analyze_topic_drift(self, candidates: List[Tuple[int, str]],
+                             para_embeddings: np.ndarray,
+                             topic_embeddings: np.ndarray) -> List[Dict[str, Any]]:
+        """Analyze how the text drifts from the main topics."""
+        if not candidates:
+            return []
         
-        # Get embeddings for topics
-        topic_embeddings = await loop.run_in_executor(
-            self.executor,
-            self.sentence_model.encode,
-            topics
-        )
+        # Best relevance of each paragraph to any topic, in one matmul
+        max_relevances = (para_embeddings @ topic_embeddings.T).max(axis=1)
         
-        # Analyze each paragraph
+        # Report paragraphs with low relevance to all topics
         drift_analysis = []
-        for i, paragraph in enumerate(paragraphs):
-            if len(paragraph.strip()) < 50:  # Skip very short paragraphs
-                continue
-            
-            # Get paragraph embedding
-            para_embedding = await loop.run_in_executor(
-                self.executor,
-                self.sentence_model.encode,
-                [paragraph]
-            )
-            
-            # Calculate relevance to each topic
-            relevances = []
-            for topic_emb in topic_embeddings:
-                similarity = cosine_similarity(
-                    para_embedding[0].reshape(1, -1),
-                    topic_emb.reshape(1, -1)
-                )[0][0]
-                relevances.append(float(similarity))
-            
-            # Check if this paragraph has low relevance to all topics
-            max_relevance = max(relevances) if relevances else 0
-            if max_relevance < 0.3:  # Threshold for topic drift
-                drift_analysis.append({
-                    'paragraph_index': i,
-                    'relevance_score': max_relevance,
-                    'preview': paragraph[:100] + '...' if len(paragraph) > 100 else paragraph,
-                    'suggestion': 'This section seems to drift from the main topic'
-                })
+        for j in np.flatnonzero(max_relevances < 0.3).tolist():  # Threshold for topic drift
+            i, paragraph = candidates[j]
+            drift_analysis.append({
+                'paragraph_index': i,
+                'relevance_score': float(max_relevances[j]),
+                'preview': paragraph[:100] + '...' if len(paragraph) > 100 else paragraph,
+                'suggestion': 'This section seems to drift from the main topic'
+            })
         
         return drift_analysis
     
-    async def _get_api_analysis(self, text: str, topics: List[str]) -> Dict[str, Any]:
+    async def _get_cached_api_analysis(self, text: str, topics: List[str],
+                                       text_embedding: Optional[np.ndarray],
+                                       api_request=None) -> Dict[str, Any]:
+        """Get API analysis, reusing a cached response for similar texts on the same topics.
+        
+        Args:
+            text: Preprocessed text
+            topics: Topics to check relevance against
+            text_embedding: Embedding of the whole text, or None
+            api_request: Optional CombinedRequest shared with the other analyzers
+            
+        Returns:
+            Parsed API analysis
+        """
+        if self.analysis_cache is None or text_embedding is None:
+            return await self._get_api_analysis(text, topics, api_request)
+        
+        tag = '\n'.join(topics)
+        
+        cached = self.analysis_cache.get(text_embedding, tag=tag)
+        if cached is not None:
+            # Leave relevance out of the shared Gemini request
+            if api_request is not None:
+                api_request.skip('relevance')
+            return cached
+        
+        analysis = await self._get_api_analysis(text, topics, api_request)
+        if analysis:
+            await self.analysis_cache.set(text_embedding, analysis, tag=tag)
+        
+        return analysis
+    
+    async def _get_api_analysis(self, text: str, topics: List[str],
+                                api_request=None) -> Dict[str, Any]:
         """Get relevance analysis from Gemini API."""
         if not self.gemini_service:
             return {}
         
+        if api_request is not None:
+            analysis = await api_request.section('relevance', text)
+            if analysis is not None:
+                return analysis
+        
         topics_str = ', '.join(topics)
         prompt = f"""Analyze how well the following text addresses the topic(s): {topics_str}
         
@@ -383,23 +533,13 @@ class RelevanceAnalyzer(BaseAnalyzer):
     
     def _split_paragraphs(self, text: str) -> List[str]:
         """Split text into paragraphs."""
-        import re
-        paragraphs = re.split(r'\n\s*\n', text)
-        return [p.strip() for p in paragraphs if p.strip()]
+        paragraphs = (p.strip() for p in _PARA_RE.split(text))
+        return [p for p in paragraphs if p]
     
     def _parse_api_response(self, response: str) -> Dict[str, Any]:
         """Parse API response."""
-        import json
-        
         try:
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = response[json_start:json_end]
-                return json.loads(json_str)
-            else:
-                return {}
+            return extract_json(response, dict)
         except Exception as e:
             self.logger.error(f"Failed to parse API response: {e}")
             return {}
\ No newline at end of file
@@ -28,8 +28,21 @@ class Settings(BaseSettings):
     cache_ttl: int = 3600  # 1 hour
     cache_dir: Path = Path("cache")
     
+    # Reuse coherence feedback only for near-identical texts; it points at this
+    # text's own paragraphs, and mean sentence embeddings of same-topic essays
+    # sit closer together than whole-text embeddings
+    coherence_cache_threshold: float = 0.98
+    
+    # Stricter bound for relevance, whose feedback names this text's own
+    # missing aspects and off-topic sections
+    relevance_cache_threshold: float = 0.95
+    
+    # Keep exact Gemini responses for this long (0 = never expire)
+    gemini_cache_ttl: int = 7 * 24 * 3600  # 1 week
+    
     # API Rate Limits
     gemini_rate_limit: int = 60
+    gemini_concurrency: int = 4  # Gemini requests in flight at once
     api_timeout: int = 30
     
     # File Upload
@@ -41,7 +54,15 @@ class Settings(BaseSettings):
     
     # Model Configuration
     embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embedding_backend: str = "torch"  # "torch" or "onnx" (ONNX Runtime)
+    embedding_onnx_file: Optional[str] = None  # e.g. "onnx/model_qint8_avx512_vnni.onnx"
+    embedding_disk_cache: bool = True  # persist sentence embeddings under cache_dir
+    embedding_batch_size: int = 32
+    embedding_quantize: bool = False  # int8 dynamic quantization of Linear layers on CPU
     spacy_model: str = "en_core_web_sm"
+    languagetool_server_url: Optional[str] = None  # shared LanguageTool server, e.g. "http://localhost:8010"
+    nltk_data_dir: Optional[Path] = None  # pre-downloaded NLTK data searched first
+    analysis_workers: int = 0  # processes for local batch analysis; Gemini stays in the API process (0 = no pool)
     gemini_model: str = "gemini-1.0-pro"
     
     # Scoring Weights (customizable)
@@ -80,4 +101,11 @@ class Settings(BaseSettings):
 
 # Create global settings instance
 settings = Settings()
-settings.normalize_weights()
\ No newline at end of file
+settings.normalize_weights()
+
+# Point NLTK at the pre-downloaded data before any module imports nltk,
+# which reads NLTK_DATA once when building its search path
+if settings.nltk_data_dir:
+    os.environ['NLTK_DATA'] = os.pathsep.join(
+        filter(None, [str(settings.nltk_data_dir), os.environ.get('NLTK_DATA')])
+    )
\ No newline at end of file
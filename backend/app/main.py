@@ -1,28 +1,35 @@
 """Main FastAPI application."""
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 import logging
 import sys
 from pathlib import Path
 import uuid
-from typing import List, Dict, Any
+import asyncio
+import bisect
+import itertools
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Dict, Any, Optional, Tuple
 import json
+import tempfile
+import numpy as np
 
 from app.config import settings
 from app.models.schemas import (
     TextInput, BatchTextInput, AnalysisResult, 
     ExportRequest, ExportResponse, HistoryItem
 )
-from app.analyzers.grammar_analyzer import GrammarAnalyzer
-from app.analyzers.coherence_analyzer import CoherenceAnalyzer
-from app.analyzers.relevance_analyzer import RelevanceAnalyzer
 from app.services.export_service import ExportService
 from app.services.cache_service import CacheService
 from app.services.db_service import DatabaseService
+from app.services.analysis_runner import AnalysisRunner
+from app.services.gemini_service import create_combined_request
 from app.utils.text_preprocessor import TextPreprocessor
 from app.utils.db_init import init_database
+from app.utils.responses import FastJSONResponse
 
 # Configure logging
 logging.basicConfig(
@@ -36,13 +43,43 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on history items returned by a single request
+MAX_HISTORY_LIMIT = 1000
+
+# Texts analyzed concurrently within one batch request
+BATCH_CONCURRENCY = 8
+
+# Bytes read per chunk when streaming an upload
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Uploads larger than this are spooled to a temporary file instead of memory
+UPLOAD_SPOOL_SIZE = 8 * 1024 * 1024
+
+# Default scoring weights, already normalized by settings at import
+_DEFAULT_WEIGHTS = MappingProxyType({
+    'grammar': settings.grammar_weight,
+    'coherence': settings.coherence_weight,
+    'relevance': settings.relevance_weight
+})
+
+# Overall-score band edges and the feedback level for each band
+_LEVEL_THRESHOLDS = (60, 70, 80, 90)
+_LEVELS = ("needs improvement", "fair", "good", "very good", "excellent")
+
+# Score columns of the batch score matrix, in order
+SCORE_COLUMNS = ('overall', 'grammar', 'coherence', 'relevance')
+
+# Lower-cased upload extensions, built once for per-request lookups
+_ALLOWED_EXT = frozenset(ext.lower() for ext in settings.allowed_extensions)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Text Scoring System",
     description="Advanced text analysis system with grammar, coherence, and relevance scoring",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
 # Configure CORS
@@ -55,13 +92,31 @@ app.add_middleware(
 )
 
 # Initialize services
-grammar_analyzer = GrammarAnalyzer()
-coherence_analyzer = CoherenceAnalyzer()
-relevance_analyzer = RelevanceAnalyzer()
 export_service = ExportService()
 cache_service = CacheService()
 db_service = DatabaseService()
 text_preprocessor = TextPreprocessor()
+analysis_runner = AnalysisRunner(settings.analysis_workers)
+
+# Analyzers pull in spaCy, sentence-transformers and NLTK, so they are
+# imported and built on first use rather than at process start
+@lru_cache(maxsize=1)
+def get_grammar_analyzer():
+    """Get the shared grammar analyzer, creating it on first use."""
+    from app.analyzers.grammar_analyzer import GrammarAnalyzer
+    return GrammarAnalyzer()
+
+@lru_cache(maxsize=1)
+def get_coherence_analyzer():
+    """Get the shared coherence analyzer, creating it on first use."""
+    from app.analyzers.coherence_analyzer import CoherenceAnalyzer
+    return CoherenceAnalyzer()
+
+@lru_cache(maxsize=1)
+def get_relevance_analyzer():
+    """Get the shared relevance analyzer, creating it on first use."""
+    from app.analyzers.relevance_analyzer import RelevanceAnalyzer
+    return RelevanceAnalyzer()
 
 @app.on_event("startup")
 async def startup_event():
@@ -72,11 +127,6 @@ async def startup_event():
     settings.cache_dir.mkdir(exist_ok=True)
     settings.export_dir.mkdir(exist_ok=True)
     
-    # Initialize NLTK data
-    import nltk
-    nltk.download('punkt', quiet=True)
-    nltk.download('stopwords', quiet=True)
-    
     # Initialize database
     if not init_database():
         logger.error("Failed to initialize database")
@@ -89,6 +139,9 @@ async def shutdown_event():
     """Cleanup on shutdown."""
     logger.info("Shutting down Text Scoring System...")
     await cache_service.cleanup()
+    analysis_runner.shutdown()
+    export_service.shutdown()
+    db_service.close()
 
 @app.get("/")
 async def root():
@@ -112,100 +165,189 @@ async def health_check():
         }
     }
 
-@app.post("/analyze", response_model=AnalysisResult)
-async def analyze_text(input_data: TextInput):
-    """Analyze a single text."""
-    try:
-        # Check cache first
-        cache_key = cache_service.generate_key(input_data.text, input_data.topic)
-        cached_result = await cache_service.get(cache_key)
-        
-        if cached_result:
-            logger.info("Returning cached result")
-            return cached_result
-        
-        # Preprocess text
-        processed_text = text_preprocessor.process(input_data.text)
-        
-        # Run analyses in parallel
-        import asyncio
-        grammar_task = grammar_analyzer.analyze(processed_text)
-        coherence_task = coherence_analyzer.analyze(processed_text)
-        relevance_task = relevance_analyzer.analyze(
-            processed_text, 
-            topic=input_data.topic,
-            topics=input_data.topics
-        )
-        
-        grammar_score, coherence_score, relevance_score = await asyncio.gather(
-            grammar_task, coherence_task, relevance_task
-        )
-        
-        # Get text statistics
-        stats = grammar_analyzer.get_text_statistics(processed_text)
-        
-        # Calculate overall score
-        weights = {
-            'grammar': settings.grammar_weight,
-            'coherence': settings.coherence_weight,
-            'relevance': settings.relevance_weight
-        }
-        
-        # Apply custom weights if provided
-        if input_data.custom_weights:
-            weights.update(input_data.custom_weights)
-            # Normalize weights
-            total = sum(weights.values())
-            weights = {k: v/total for k, v in weights.items()}
-        
-        overall_score = (
-            grammar_score.score * weights['grammar'] +
-            coherence_score.score * weights['coherence'] +
-            relevance_score.score * weights['relevance']
-        )
-        
-        # Generate feedback summary
-        feedback_summary = _generate_feedback_summary(
-            overall_score, grammar_score, coherence_score, relevance_score
-        )
+async def _score_text(text: str, topic: Optional[str] = None,
+                      topics: Optional[List[str]] = None):
+    """Run the three analyzers and text statistics in this process.
+    
+    Args:
+        text: Preprocessed text
+        topic: Optional topic for relevance scoring
+        topics: Optional list of topics
         
-        # Identify strengths and areas for improvement
-        strengths = _identify_strengths(grammar_score, coherence_score, relevance_score)
-        improvements = _identify_improvements(grammar_score, coherence_score, relevance_score)
+    Returns:
+        Grammar, coherence and relevance scores plus the text statistics
+    """
+    loop = asyncio.get_running_loop()
+    grammar_analyzer = get_grammar_analyzer()
+    stats_task = loop.run_in_executor(
+        None, grammar_analyzer.get_text_statistics, text
+    )
+    
+    # The analyzers share one Gemini request instead of sending three
+    api_request = create_combined_request(topic, topics)
+    grammar_task = grammar_analyzer.analyze(text, api_request=api_request)
+    coherence_task = get_coherence_analyzer().analyze(text, api_request=api_request)
+    relevance_task = get_relevance_analyzer().analyze(
+        text, 
+        topic=topic,
+        topics=topics,
+        api_request=api_request
+    )
+    if api_request is not None:
+        grammar_task = api_request.participate('grammar', grammar_task)
+        coherence_task = api_request.participate('coherence', coherence_task)
+        relevance_task = api_request.participate('relevance', relevance_task)
+    
+    return await asyncio.gather(
+        grammar_task, coherence_task, relevance_task, stats_task
+    )
+
+async def _score_text_pooled(text: str, topic: Optional[str] = None,
+                             topics: Optional[List[str]] = None):
+    """Run the local analysis in the worker pool and finish it here.
+    
+    Args:
+        text: Preprocessed text
+        topic: Optional topic for relevance scoring
+        topics: Optional list of topics
         
-        # Create result
-        result = AnalysisResult(
-            overall_score=round(overall_score, 2),
-            grammar=grammar_score,
-            coherence=coherence_score,
-            relevance=relevance_score,
-            word_count=stats['word_count'],
-            sentence_count=stats['sentence_count'],
-            paragraph_count=stats['paragraph_count'],
-            avg_sentence_length=round(stats['avg_sentence_length'], 2),
-            processing_time=sum([
-                getattr(grammar_score, 'processing_time', 0),
-                getattr(coherence_score, 'processing_time', 0),
-                getattr(relevance_score, 'processing_time', 0)
-            ]),
-            feedback_summary=feedback_summary,
-            strengths=strengths,
-            areas_for_improvement=improvements
-        )
+    Returns:
+        Grammar, coherence and relevance scores plus the text statistics
+    """
+    grammar_local, coherence_local, relevance_local, stats = (
+        await analysis_runner.analyze_local(text, topic, topics)
+    )
+    
+    # Gemini calls stay in this process, under its shared rate limit
+    api_request = create_combined_request(topic, topics)
+    grammar_task = get_grammar_analyzer().complete(grammar_local, api_request=api_request)
+    coherence_task = get_coherence_analyzer().complete(coherence_local, api_request=api_request)
+    relevance_task = get_relevance_analyzer().complete(relevance_local, api_request=api_request)
+    if api_request is not None:
+        grammar_task = api_request.participate('grammar', grammar_task)
+        coherence_task = api_request.participate('coherence', coherence_task)
+        relevance_task = api_request.participate('relevance', relevance_task)
+    
+    grammar_score, coherence_score, relevance_score = await asyncio.gather(
+        grammar_task, coherence_task, relevance_task
+    )
+    return grammar_score, coherence_score, relevance_score, stats
+
+async def _run_analysis(input_data: TextInput,
+                        pending_cache: Optional[List[Tuple[str, AnalysisResult]]] = None,
+                        use_pool: bool = False,
+                        pending_rows: Optional[List[Tuple[str, str, Optional[str], AnalysisResult]]] = None
+                        ) -> Tuple[AnalysisResult, Optional[str]]:
+    """Analyze a text, serving from the cache when possible.
+    
+    Args:
+        input_data: Text and analysis options
+        pending_cache: If given, the new cache entry is appended here for the
+            caller to write in bulk instead of being written immediately
+        use_pool: Run the analyzers in the worker process pool
+        pending_rows: If given, the new database row is appended here for the
+            caller to store in bulk instead of being queued
         
-        # Cache result
+    Returns:
+        The analysis result and its stored result id, or None for cache hits
+    """
+    # Check cache first
+    text_hash = cache_service.hash_text(input_data.text)
+    cache_key = cache_service.generate_key(
+        input_data.text, input_data.topic, text_hash=text_hash
+    )
+    cached_result = await cache_service.get(cache_key)
+    
+    if cached_result:
+        logger.info("Returning cached result")
+        return cached_result, None
+    
+    # Preprocess text; regex cleanup of large inputs runs off the event loop
+    loop = asyncio.get_running_loop()
+    processed_text = await loop.run_in_executor(
+        None, text_preprocessor.process, input_data.text
+    )
+    
+    # Run analyses in parallel
+    score_text = _score_text_pooled if use_pool else _score_text
+    grammar_score, coherence_score, relevance_score, stats = await score_text(
+        processed_text, input_data.topic, input_data.topics
+    )
+    
+    # Calculate overall score, applying custom weights if provided
+    weights = (
+        _normalize_weights(input_data.custom_weights)
+        if input_data.custom_weights else _DEFAULT_WEIGHTS
+    )
+    
+    overall_score = (
+        grammar_score.score * weights['grammar'] +
+        coherence_score.score * weights['coherence'] +
+        relevance_score.score * weights['relevance']
+    )
+    
+    # Generate feedback summary
+    feedback_summary = _generate_feedback_summary(
+        overall_score, grammar_score, coherence_score, relevance_score
+    )
+    
+    # Identify strengths and areas for improvement
+    strengths = _identify_strengths(grammar_score, coherence_score, relevance_score)
+    improvements = _identify_improvements(grammar_score, coherence_score, relevance_score)
+    
+    # Create result
+    result = AnalysisResult(
+        overall_score=round(overall_score, 2),
+        grammar=grammar_score,
+        coherence=coherence_score,
+        relevance=relevance_score,
+        word_count=stats['word_count'],
+        sentence_count=stats['sentence_count'],
+        paragraph_count=stats['paragraph_count'],
+        avg_sentence_length=round(stats['avg_sentence_length'], 2),
+        processing_time=sum([
+            getattr(grammar_score, 'processing_time', 0),
+            getattr(coherence_score, 'processing_time', 0),
+            getattr(relevance_score, 'processing_time', 0)
+        ]),
+        feedback_summary=feedback_summary,
+        strengths=strengths,
+        areas_for_improvement=improvements
+    )
+    
+    # Cache result
+    if pending_cache is None:
         await cache_service.set(cache_key, result)
-        
-        # Store in database
-        result_id = str(uuid.uuid4())
-        db_service.store_result(result_id, input_data.text, input_data.topic, result)
+    else:
+        pending_cache.append((cache_key, result))
+    
+    # Store in database
+    result_id = str(uuid.uuid4())
+    if pending_rows is None:
+        db_service.queue_result(result_id, input_data.text, input_data.topic, result)
+    else:
+        pending_rows.append((result_id, input_data.text, input_data.topic, result))
+    
+    return result, result_id
 
-        # Add both id and result_id to response for compatibility
-        result_dict = result.dict()
-        result_dict['result_id'] = result_id
-        result_dict['id'] = result_id  # Add this for compatibility
+def _result_response(result: AnalysisResult, result_id: Optional[str]):
+    """Build the response body for an analysis result."""
+    if result_id is None:
+        return result
+    
+    # Add both id and result_id to response for compatibility
+    result_dict = result.dict()
+    result_dict['result_id'] = result_id
+    result_dict['id'] = result_id  # Add this for compatibility
+    
+    return result_dict
 
-        return result_dict
+@app.post("/analyze", response_model=AnalysisResult)
+async def analyze_text(input_data: TextInput):
+    """Analyze a single text."""
+    try:
+        result, result_id = await _run_analysis(input_data)
+        return _result_response(result, result_id)
         
     except Exception as e:
         logger.error(f"Analysis error: {e}")
@@ -215,11 +357,25 @@ async def analyze_text(input_data: TextInput):
 async def analyze_batch(input_data: BatchTextInput):
     """Analyze multiple texts."""
     try:
-        results = []
+        # Analyze texts concurrently; the semaphore keeps rate-limited APIs
+        # and the analyzer thread pool from being flooded
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        pending_cache: List[Tuple[str, AnalysisResult]] = []
+        pending_rows: List[Tuple[str, str, Optional[str], AnalysisResult]] = []
         
-        for text_input in input_data.texts:
-            result = await analyze_text(text_input)
-            results.append(result)
+        async def analyze_one(text_input: TextInput):
+            async with semaphore:
+                return await _run_analysis(
+                    text_input, pending_cache, use_pool=analysis_runner.enabled,
+                    pending_rows=pending_rows
+                )
+        
+        analyses = await asyncio.gather(*(analyze_one(t) for t in input_data.texts))
+        results = [result for result, _ in analyses]
+        
+        # Write all new cache entries and result rows in one transaction each
+        await cache_service.set_many(pending_cache)
+        await db_service.store_results_async(pending_rows)
         
         # Comparative analysis if requested
         comparative_analysis = None
@@ -230,7 +386,7 @@ async def analyze_batch(input_data: BatchTextInput):
         summary_stats = _calculate_summary_statistics(results)
         
         return {
-            "results": results,
+            "results": [_result_response(result, result_id) for result, result_id in analyses],
             "comparative_analysis": comparative_analysis,
             "summary_statistics": summary_stats
         }
@@ -248,32 +404,40 @@ async def analyze_file(
     """Analyze text from uploaded file."""
     try:
         # Validate file
-        if not file.filename.endswith(tuple(settings.allowed_extensions)):
+        if Path(file.filename or "").suffix.lower() not in _ALLOWED_EXT:
             raise HTTPException(
                 status_code=400,
                 detail=f"File type not supported. Allowed types: {settings.allowed_extensions}"
             )
         
-        # Check file size
-        contents = await file.read()
-        if len(contents) > settings.max_file_size:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large. Maximum size: {settings.max_file_size / 1024 / 1024}MB"
+        # Stream the upload into a spooled file so oversized files are
+        # rejected early and large ones never sit in memory as one bytes copy
+        with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_SIZE) as spool:
+            total = 0
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                total += len(chunk)
+                if total > settings.max_file_size:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"File too large. Maximum size: {settings.max_file_size / 1024 / 1024}MB"
+                    )
+                spool.write(chunk)
+            spool.seek(0)
+            
+            # Extract text based on file type
+            text = await text_preprocessor.extract_text_from_file(
+                spool, 
+                file.filename
             )
         
-        # Extract text based on file type
-        text = await text_preprocessor.extract_text_from_file(
-            contents, 
-            file.filename
-        )
-        
         # Create input and analyze
         text_input = TextInput(text=text, topic=topic)
         result = await analyze_text(text_input)
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"File analysis error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -283,7 +447,7 @@ async def export_analysis(export_request: ExportRequest):
     """Export analysis results."""
     try:
         # Get result from database
-        result = db_service.get_result(export_request.result_id)
+        result = await db_service.get_result_async(export_request.result_id)
         if not result:
             raise HTTPException(status_code=404, detail="Analysis result not found")
         
@@ -324,14 +488,14 @@ async def download_file(filename: str):
     )
 
 @app.get("/history", response_model=List[HistoryItem])
-async def get_history(limit: int = 10):
+async def get_history(limit: int = Query(10, ge=1, le=MAX_HISTORY_LIMIT)):
     """Get analysis history."""
-    return db_service.get_history(limit)
+    return await db_service.get_history_async(limit)
 
 @app.delete("/history/{result_id}")
 async def delete_history_item(result_id: str):
     """Delete a history item."""
-    if not db_service.delete_result(result_id):
+    if not await db_service.delete_result_async(result_id):
         raise HTTPException(status_code=404, detail="Result not found")
     
     return {"message": "Deleted successfully"}
@@ -339,7 +503,7 @@ async def delete_history_item(result_id: str):
 @app.get("/analysis/{result_id}", response_model=AnalysisResult)
 async def get_analysis_result(result_id: str):
     """Get a specific analysis result."""
-    result = db_service.get_result(result_id)
+    result = await db_service.get_result_async(result_id)
     if not result:
         raise HTTPException(status_code=404, detail="Analysis result not found")
     
@@ -350,18 +514,15 @@ async def get_analysis_result(result_id: str):
     return result_dict
 
 # Helper functions
+def _normalize_weights(custom_weights: Dict[str, float]) -> Dict[str, float]:
+    """Merge custom weights over the defaults and normalize them to sum to 1."""
+    weights = {**_DEFAULT_WEIGHTS, **custom_weights}
+    total = sum(weights.values())
+    return {k: v/total for k, v in weights.items()}
+
 def _generate_feedback_summary(overall_score: float, grammar, coherence, relevance) -> str:
     """Generate a summary of the analysis."""
-    if overall_score >= 90:
-        level = "excellent"
-    elif overall_score >= 80:
-        level = "very good"
-    elif overall_score >= 70:
-        level = "good"
-    elif overall_score >= 60:
-        level = "fair"
-    else:
-        level = "needs improvement"
+    level = _LEVELS[bisect.bisect_right(_LEVEL_THRESHOLDS, overall_score)]
     
     summary = f"Your text scores {overall_score:.1f}/100, which is {level}. "
     
@@ -403,49 +564,47 @@ def _identify_strengths(grammar, coherence, relevance) -> List[str]:
 
 def _identify_improvements(grammar, coherence, relevance) -> List[str]:
     """Identify areas for improvement."""
-    improvements = []
-    
-    # Combine suggestions from all analyzers
-    all_suggestions = []
-    all_suggestions.extend(grammar.suggestions)
-    all_suggestions.extend(coherence.suggestions)
-    all_suggestions.extend(relevance.suggestions)
-    
-    # Remove duplicates and limit
-    seen = set()
-    for suggestion in all_suggestions:
-        if suggestion not in seen:
-            improvements.append(suggestion)
-            seen.add(suggestion)
-            if len(improvements) >= 3:
-                break
+    # Combine suggestions from all analyzers, deduplicated in order
+    all_suggestions = itertools.chain(
+        grammar.suggestions, coherence.suggestions, relevance.suggestions
+    )
     
-    return improvements
+    return list(dict.fromkeys(all_suggestions))[:3]
+
+def _score_matrix(results: List[AnalysisResult]) -> np.ndarray:
+    """Collect result scores into an (N, 4) array ordered as SCORE_COLUMNS."""
+    scores = np.fromiter(
+        itertools.chain.from_iterable(
+            (r.overall_score, r.grammar.score, r.coherence.score, r.relevance.score)
+            for r in results
+        ),
+        dtype=np.float64,
+        count=len(results) * len(SCORE_COLUMNS)
+    )
+    return scores.reshape(-1, len(SCORE_COLUMNS))
 
 def _perform_comparative_analysis(results: List[AnalysisResult]) -> Dict[str, Any]:
     """Perform comparative analysis on multiple results."""
-    scores = {
-        'overall': [r.overall_score for r in results],
-        'grammar': [r.grammar.score for r in results],
-        'coherence': [r.coherence.score for r in results],
-        'relevance': [r.relevance.score for r in results]
-    }
+    scores = _score_matrix(results)
+    averages = scores.mean(axis=0).tolist()
+    consistent = (np.ptp(scores, axis=0) < 20).tolist()
     
     return {
-        'average_scores': {k: sum(v)/len(v) for k, v in scores.items()},
-        'best_text_index': scores['overall'].index(max(scores['overall'])),
-        'consistency': {
-            k: max(v) - min(v) < 20 for k, v in scores.items()
-        }
+        'average_scores': dict(zip(SCORE_COLUMNS, averages)),
+        'best_text_index': int(scores[:, 0].argmax()),
+        'consistency': dict(zip(SCORE_COLUMNS, consistent))
     }
 
 def _calculate_summary_statistics(results: List[AnalysisResult]) -> Dict[str, Any]:
     """Calculate summary statistics for batch results."""
+    overall = np.fromiter((r.overall_score for r in results), dtype=np.float64, count=len(results))
+    words = np.fromiter((r.word_count for r in results), dtype=np.int64, count=len(results))
+    
     return {
         'total_texts': len(results),
-        'average_score': sum(r.overall_score for r in results) / len(results),
-        'total_words': sum(r.word_count for r in results),
-        'average_words': sum(r.word_count for r in results) / len(results)
+        'average_score': float(overall.mean()),
+        'total_words': int(words.sum()),
+        'average_words': float(words.mean())
     }
 
 if __name__ == "__main__":
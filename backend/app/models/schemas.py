@@ -90,6 +90,42 @@ class AnalysisResult(BaseModel):
     feedback_summary: str
     strengths: List[str] = Field(default_factory=list)
     areas_for_improvement: List[str] = Field(default_factory=list)
+    
+    @classmethod
+    def construct_trusted(cls, data: Dict[str, Any]) -> "AnalysisResult":
+        """Rebuild a result from this service's own serialized output.
+        
+        Skips validation entirely, so only pass data produced by model_dump
+        or model_dump_json (cache and database entries). Nested models,
+        enums and the timestamp are restored so attribute access and
+        re-serialization behave like a validated instance.
+        
+        Args:
+            data: Dumped result, in python or JSON mode
+            
+        Returns:
+            AnalysisResult built without running validators
+        """
+        grammar = dict(data['grammar'])
+        grammar['errors'] = [
+            Error.model_construct(**{
+                **error,
+                'type': ErrorType(error['type']),
+                'severity': Severity(error['severity'])
+            })
+            for error in grammar.get('errors', [])
+        ]
+        
+        fields = {
+            **data,
+            'grammar': GrammarScore.model_construct(**grammar),
+            'coherence': CoherenceScore.model_construct(**data['coherence']),
+            'relevance': RelevanceScore.model_construct(**data['relevance'])
+        }
+        if isinstance(fields.get('timestamp'), str):
+            fields['timestamp'] = datetime.fromisoformat(fields['timestamp'])
+        
+        return cls.model_construct(**fields)
 
 class BatchAnalysisResult(BaseModel):
     """Batch analysis results."""
@@ -0,0 +1,124 @@
+"""Optional process pool that runs the local analysis outside the API process."""
+
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-worker state, created once by _worker_init in each pool process
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_analyzers: Optional[Tuple[Any, Any, Any]] = None
+
+def _worker_init():
+    """Load the analyzers and an event loop in a freshly started worker."""
+    global _worker_loop, _worker_analyzers
+    
+    # Workers only run the local analysis; Gemini, its rate limit and the
+    # semantic caches stay in the API process, so never build them here
+    settings.gemini_api_key = None
+    
+    from app.analyzers.grammar_analyzer import GrammarAnalyzer
+    from app.analyzers.coherence_analyzer import CoherenceAnalyzer
+    from app.analyzers.relevance_analyzer import RelevanceAnalyzer
+    
+    # One long-lived loop per worker, since the analyzers keep loop-bound
+    # state such as the spaCy batching queue between calls
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    _worker_analyzers = (GrammarAnalyzer(), CoherenceAnalyzer(), RelevanceAnalyzer())
+
+def _worker_analyze(text: str, topic: Optional[str], topics: Optional[List[str]]):
+    """Run the local part of all three analyzers on one preprocessed text.
+    
+    Args:
+        text: Preprocessed text
+        topic: Optional topic for relevance scoring
+        topics: Optional list of topics
+    
+    Returns:
+        Grammar, coherence and relevance local results plus the text statistics
+    """
+    grammar_analyzer, coherence_analyzer, relevance_analyzer = _worker_analyzers
+    
+    async def run():
+        return await asyncio.gather(
+            grammar_analyzer.analyze_local(text),
+            coherence_analyzer.analyze_local(text),
+            relevance_analyzer.analyze_local(text, topic=topic, topics=topics)
+        )
+    
+    grammar_local, coherence_local, relevance_local = _worker_loop.run_until_complete(run())
+    stats = grammar_analyzer.get_text_statistics(text)
+    
+    return grammar_local, coherence_local, relevance_local, stats
+
+class AnalysisRunner:
+    """Runs the local part of whole-text analyses in a pool of worker processes.
+    
+    Each worker loads its own spaCy, LanguageTool and sentence-transformer
+    models once, so independent texts of a batch are analyzed on separate
+    cores instead of contending for the API process's GIL. Workers are
+    spawned rather than forked so no torch or tokenizer threads are
+    inherited in a broken state.
+    
+    Workers never call Gemini: the API process completes each result with
+    the analyzers' complete(), so the rate limit, concurrency cap and
+    semantic caches are shared by every analysis and no worker sits idle
+    on a network round trip.
+    """
+    
+    def __init__(self, workers: int = 0):
+        """Initialize the runner.
+        
+        Args:
+            workers: Number of worker processes; 0 disables the pool
+        """
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+    
+    @property
+    def enabled(self) -> bool:
+        """Whether analyses should be sent to the pool."""
+        return self.workers > 0
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Start the pool on first use."""
+        if self._pool is None:
+            logger.info(f"Starting analysis pool with {self.workers} workers")
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_worker_init
+            )
+        return self._pool
+    
+    async def analyze_local(self, text: str, topic: Optional[str] = None,
+                            topics: Optional[List[str]] = None
+                            ) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any],
+                                       Optional[Dict[str, Any]], Dict[str, Any]]:
+        """Run the local analysis of a preprocessed text in a worker process.
+        
+        Args:
+            text: Preprocessed text
+            topic: Optional topic for relevance scoring
+            topics: Optional list of topics
+        
+        Returns:
+            Grammar, coherence and relevance local results, to be passed to
+            each analyzer's complete(), plus the text statistics
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_pool(), _worker_analyze, text, topic, topics
+        )
+    
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
\ No newline at end of file
@@ -3,25 +3,35 @@
 import hashlib
 import json
 import time
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, List, Tuple
 from pathlib import Path
 import diskcache
 import logging
+from pydantic_core import from_json
 import redis.asyncio as redis
 from datetime import datetime, timedelta
 
 from app.config import settings
 from app.models.schemas import AnalysisResult, HistoryItem
 from app.utils.text_preprocessor import preprocess_text
+from app.utils.lru_cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# Cache entry format version; 1.2.0 stores the whole entry as JSON text
+CACHE_VERSION = '1.2.0'
+
+# Results kept in the per-process memory tier
+MEMORY_CACHE_SIZE = 256
+
 class CacheService:
     """Service for caching analysis results."""
     
     def __init__(self):
         """Initialize cache service."""
         self.enabled = settings.cache_enabled
+        # Recent results as (expires_at, result), checked before the disk tier
+        self._memory = LRUCache(MEMORY_CACHE_SIZE)
         
         if self.enabled:
             # Initialize disk cache
@@ -34,21 +44,68 @@ class CacheService:
             logger.info(f"Cache initialized at {cache_path}")
         else:
             self.cache = None
+            # Specialize once: keys are never looked up and reads/writes do
+            # nothing, so skip the hashing and per-call enabled checks
+            self.hash_text = self._disabled_hash
+            self.generate_key = self._disabled_key
+            self.get = self._disabled_none
+            self.set = self._disabled_false
+            self.set_many = self._disabled_false
+            self.delete = self._disabled_false
+            self.clear = self._disabled_false
+            self.cleanup = self._disabled_none
             logger.info("Cache disabled")
     
-    def generate_key(self, text: str, topic: Optional[str] = None) -> str:
+    def _disabled_hash(self, text: str) -> bytes:
+        """hash_text replacement used when caching is disabled."""
+        return b''
+    
+    def _disabled_key(self, text: str, topic: Optional[str] = None,
+                      text_hash: Optional[bytes] = None) -> str:
+        """generate_key replacement used when caching is disabled."""
+        return ''
+    
+    async def _disabled_none(self, *args, **kwargs) -> None:
+        """No-op for cache reads and cleanup when caching is disabled."""
+        return None
+    
+    async def _disabled_false(self, *args, **kwargs) -> bool:
+        """No-op for cache writes when caching is disabled."""
+        return False
+    
+    def hash_text(self, text: str) -> bytes:
+        """Hash text content once so it can be reused across cache keys.
+        
+        Keys need no cryptographic strength, so BLAKE2b (faster than SHA-256
+        in CPython and in the standard library) with a 128-bit digest is used.
+        
+        Args:
+            text: Text content
+            
+        Returns:
+            Digest of the text
+        """
+        return hashlib.blake2b(text.encode(), digest_size=16).digest()
+    
+    def generate_key(self, text: str, topic: Optional[str] = None,
+                     text_hash: Optional[bytes] = None) -> str:
         """Generate cache key from text and topic.
         
         Args:
             text: Text content
             topic: Optional topic
+            text_hash: Precomputed hash_text(text); skips rehashing the text
             
         Returns:
             Cache key string
         """
-        # Create a unique key based on text content and topic
-        content = f"{text}:{topic if topic else ''}"
-        return hashlib.sha256(content.encode()).hexdigest()
+        # Create a unique key based on text content and topic; only the
+        # short topic suffix is hashed when the text digest is supplied
+        digest = hashlib.blake2b(text_hash or self.hash_text(text), digest_size=16)
+        digest.update(b':')
+        if topic:
+            digest.update(topic.encode())
+        return digest.hexdigest()
     
     async def get(self, key: str) -> Optional[AnalysisResult]:
         """Get result from cache.
@@ -62,13 +119,26 @@ class CacheService:
         if not self.enabled or not self.cache:
             return None
         
+        memory_entry = self._memory.get(key)
+        if memory_entry is not None:
+            expires_at, result = memory_entry
+            if expires_at > time.time():
+                logger.info(f"Memory cache hit for key: {key[:8]}...")
+                return result
+            self._memory.delete(key)
+        
         try:
             cached_data = self.cache.get(key)
+            if isinstance(cached_data, str):
+                cached_data = from_json(cached_data)
             if cached_data:
                 # Check if cache is still valid
                 if self._is_cache_valid(cached_data):
                     logger.info(f"Cache hit for key: {key[:8]}...")
-                    return AnalysisResult(**cached_data['result'])
+                    # Written by set() from a validated model; skip revalidation
+                    result = AnalysisResult.construct_trusted(cached_data['result'])
+                    self._remember(key, result, cached_data['timestamp'])
+                    return result
                 else:
                     # Remove expired cache
                     await self.delete(key)
@@ -92,17 +162,13 @@ class CacheService:
             return False
         
         try:
-            cache_data = {
-                'result': result.dict(),
-                'timestamp': time.time(),
-                'version': '1.0.0'
-            }
-            
+            stored_at = time.time()
             self.cache.set(
                 key, 
-                cache_data,
+                self._entry(result, stored_at),
                 expire=settings.cache_ttl
             )
+            self._remember(key, result, stored_at)
             
             logger.info(f"Cached result for key: {key[:8]}...")
             return True
@@ -111,6 +177,58 @@ class CacheService:
             logger.error(f"Cache set error: {e}")
             return False
     
+    async def set_many(self, items: List[Tuple[str, AnalysisResult]]) -> bool:
+        """Store several results in one cache transaction.
+        
+        Args:
+            items: (key, result) pairs to cache
+            
+        Returns:
+            True if successful
+        """
+        if not self.enabled or not self.cache or not items:
+            return False
+        
+        try:
+            # One SQLite commit for the whole batch instead of one per entry
+            stored_at = time.time()
+            entries = [self._entry(result, stored_at) for _, result in items]
+            with self.cache.transact():
+                for (key, _), entry in zip(items, entries):
+                    self.cache.set(key, entry, expire=settings.cache_ttl)
+            for key, result in items:
+                self._remember(key, result, stored_at)
+            
+            logger.info(f"Cached {len(items)} results")
+            return True
+            
+        except Exception as e:
+            logger.error(f"Cache set_many error: {e}")
+            return False
+    
+    def _entry(self, result: AnalysisResult, stored_at: float) -> str:
+        """Build the stored cache entry for a result.
+        
+        The entry is a single JSON document with the result spliced in from
+        pydantic-core's Rust encoder. diskcache stores str values as plain
+        text, so entries skip pickle on both write and read.
+        
+        Args:
+            result: Analysis result to cache
+            stored_at: Unix time the entry is written
+            
+        Returns:
+            JSON text of the cache entry
+        """
+        return (
+            f'{{"version":"{CACHE_VERSION}","timestamp":{stored_at!r},'
+            f'"result":{result.model_dump_json()}}}'
+        )
+    
+    def _remember(self, key: str, result: AnalysisResult, stored_at: float):
+        """Keep a result in the memory tier until its disk entry expires."""
+        self._memory.set(key, (stored_at + settings.cache_ttl, result))
+    
     async def delete(self, key: str) -> bool:
         """Delete item from cache.
         
@@ -123,6 +241,7 @@ class CacheService:
         if not self.enabled or not self.cache:
             return False
         
+        self._memory.delete(key)
         try:
             return self.cache.delete(key)
         except Exception as e:
@@ -138,6 +257,7 @@ class CacheService:
         if not self.enabled or not self.cache:
             return False
         
+        self._memory.clear()
         try:
             self.cache.clear()
             logger.info("Cache cleared")
@@ -187,7 +307,7 @@ class CacheService:
             True if valid
         """
         # Check version compatibility
-        if cached_data.get('version') != '1.0.0':
+        if cached_data.get('version') != CACHE_VERSION:
             return False
         
         # Check timestamp (handled by disk cache expiration)
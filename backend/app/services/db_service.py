@@ -1,43 +1,355 @@
 """Database service for storing analysis results."""
 
+import asyncio
+import itertools
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Dict, Any
-import json
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from datetime import datetime
 import logging
+from pydantic_core import from_json
 
 from app.config import settings
 from app.models.schemas import AnalysisResult, HistoryItem
+from app.utils.db_migrations import run_migrations
+from app.utils.lru_cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# Applied once to the long-lived connection; WAL lets readers run alongside
+# the writer and NORMAL sync is durable at every checkpoint under WAL
+_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',
+    # Checkpoints run on a timer thread instead of inside whichever write
+    # happens to cross the 1000-page threshold
+    'PRAGMA wal_autocheckpoint=0'
+)
+
+# Seconds between background WAL checkpoints
+WAL_CHECKPOINT_INTERVAL = 30
+
+# Queued results are written together once this many are pending...
+WRITE_BATCH_SIZE = 100
+
+# ...or once the oldest has waited this many seconds
+WRITE_BATCH_DELAY = 0.05
+
+# Parsed results kept in memory; stored results are never updated
+RESULT_CACHE_SIZE = 512
+
+# Read-only connections shared by concurrent readers
+READ_CONNECTIONS = 4
+
+# Newest history items mirrored in memory for small history pages
+RECENT_HISTORY_SIZE = 256
+
+_INSERT_SQL = '''
+    INSERT INTO analysis_results
+        (id, text, topic, result_data, timestamp, overall_score, word_count, ts_ms)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SELECT_RESULT_SQL = 'SELECT result_data FROM analysis_results WHERE id = ?'
+
+_SELECT_HISTORY_SQL = '''
+    SELECT id, text, topic, overall_score, word_count, ts_ms
+    FROM analysis_results
+    ORDER BY ts_ms DESC
+    LIMIT ?
+'''
+
+_DELETE_SQL = 'DELETE FROM analysis_results WHERE id = ?'
+
+def _history_item(result_id: str, text: str, topic: Optional[str],
+                  overall_score: float, word_count: int, ts_ms: int) -> HistoryItem:
+    """Build a history item from stored columns.
+    
+    Values were written by this service, so field validation is skipped.
+    """
+    return HistoryItem.model_construct(
+        id=result_id,
+        timestamp=datetime.fromtimestamp(ts_ms / 1000),
+        text_preview=text[:100],  # First 100 characters
+        overall_score=overall_score,
+        word_count=word_count,
+        topic=topic
+    )
+
 class DatabaseService:
     """Service for database operations."""
     
     def __init__(self):
         """Initialize database service."""
         self.db_path = settings.data_dir / "analysis.db"
+        # One connection shared by all requests, in autocommit mode; the lock
+        # serializes access since sqlite3 connections are not thread-safe.
+        # Statements are module constants, so each is prepared once and then
+        # served from the connection's statement cache
+        self._conn = sqlite3.connect(
+            str(self.db_path), check_same_thread=False, isolation_level=None,
+            cached_statements=256
+        )
+        # sqlite3.Row is implemented in C and allows access by column name
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        # Rows queued by queue_result, written in one transaction per batch
+        self._pending: List[Tuple] = []
+        self._pending_lock = threading.Lock()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._results = LRUCache(RESULT_CACHE_SIZE)
+        # A single writer thread matches SQLite's single-writer model and
+        # keeps commits off the event loop
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
         self._init_db()
+        
+        # Readers get their own connections; under WAL they run alongside
+        # the writer instead of queueing behind its lock
+        self._read_conns: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(READ_CONNECTIONS):
+            self._read_conns.put(self._connect_readonly())
+        
+        # data_version is per connection, so change checks always use this
+        # one, under a lock of its own rather than the writer's
+        self._version_conn = self._connect_readonly()
+        self._version_lock = threading.Lock()
+        
+        self._closing = threading.Event()
+        self._checkpointer = threading.Thread(
+            target=self._checkpoint_loop, name="db-checkpoint", daemon=True
+        )
+        self._checkpointer.start()
+        
+        # Newest-first mirror of the latest rows, so dashboard-sized history
+        # pages need no query; reseeded whenever the database changes
+        self._recent: "deque[HistoryItem]" = deque(maxlen=RECENT_HISTORY_SIZE)
+        self._recent_lock = threading.Lock()
+        self._data_version: Optional[int] = None
+        self._seed_recent()
     
     def _init_db(self):
-        """Initialize database tables."""
-        conn = sqlite3.connect(str(self.db_path))
-        cursor = conn.cursor()
-        
-        # Create analysis_results table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS analysis_results (
-                id TEXT PRIMARY KEY,
-                text TEXT NOT NULL,
-                topic TEXT,
-                result_data TEXT NOT NULL,
-                timestamp DATETIME NOT NULL
+        """Configure the connection and bring the schema up to date."""
+        with self._lock:
+            for pragma in _PRAGMAS:
+                self._conn.execute(pragma)
+        
+        # Migrations own the schema, including the ts_ms index that lets
+        # get_history read newest rows straight from the index
+        if not run_migrations():
+            logger.error("Database migrations failed")
+    
+    def _connect_readonly(self) -> sqlite3.Connection:
+        """Open a read-only connection to the database."""
+        conn = sqlite3.connect(
+            f"file:{self.db_path}?mode=ro", uri=True,
+            check_same_thread=False, cached_statements=256
+        )
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection, waiting if all are in use."""
+        conn = self._read_conns.get()
+        try:
+            yield conn
+        finally:
+            self._read_conns.put(conn)
+    
+    def _checkpoint_loop(self):
+        """Copy WAL pages back into the database on a fixed interval."""
+        while not self._closing.wait(WAL_CHECKPOINT_INTERVAL):
+            try:
+                with self._lock:
+                    # PASSIVE never waits on readers, so requests aren't stalled
+                    self._conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+            except Exception as e:
+                logger.error(f"WAL checkpoint error: {e}")
+    
+    def _current_data_version(self) -> int:
+        """SQLite's data_version, which changes when another connection commits."""
+        with self._version_lock:
+            return self._version_conn.execute('PRAGMA data_version').fetchone()[0]
+    
+    def _seed_recent(self):
+        """Reload the in-memory history mirror from the database."""
+        with self._recent_lock:
+            try:
+                # Read the version first so a commit during the query forces
+                # another reseed rather than being missed
+                version = self._current_data_version()
+                items = self._query_history(RECENT_HISTORY_SIZE)
+            except Exception as e:
+                logger.error(f"Database history seed error: {e}")
+                self._recent.clear()
+                self._data_version = None
+                return
+            self._recent = deque(items, maxlen=RECENT_HISTORY_SIZE)
+            self._data_version = version
+    
+    def _remember_recent(self, row: Tuple):
+        """Put a newly stored row at the front of the history mirror."""
+        item = _history_item(row[0], row[1], row[2], row[5], row[6], row[7])
+        with self._recent_lock:
+            self._recent.appendleft(item)
+    
+    def close(self):
+        """Write any queued results and close all connections."""
+        # A pending flush timer would otherwise fire into the stopped executor
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        self._closing.set()
+        self._checkpointer.join()
+        self._db_executor.shutdown(wait=True)
+        self.flush()
+        with self._lock:
+            self._conn.close()
+        for _ in range(READ_CONNECTIONS):
+            self._read_conns.get().close()
+        with self._version_lock:
+            self._version_conn.close()
+    
+    def _row(self, result_id: str, text: str, topic: Optional[str],
+             result: AnalysisResult) -> Tuple:
+        """Build the analysis_results row for a result."""
+        now = datetime.now()
+        return (
+            result_id,
+            text,
+            topic,
+            result.model_dump_json(),
+            now.isoformat(),
+            result.overall_score,
+            result.word_count,
+            int(now.timestamp() * 1000)
+        )
+    
+    def queue_result(self, result_id: str, text: str, topic: Optional[str],
+                     result: AnalysisResult):
+        """Queue a result to be stored with the next batched write.
+        
+        Must be called from the event loop. Bursts of results share one
+        transaction, and so one fsync, instead of committing row by row.
+        Reads flush the queue first, so a queued result is always visible.
+        
+        Args:
+            result_id: Unique identifier for the result
+            text: Original text that was analyzed
+            topic: Optional topic
+            result: Analysis result to store
+        """
+        row = self._row(result_id, text, topic, result)
+        self._results.set(result_id, result)
+        self._remember_recent(row)
+        with self._pending_lock:
+            self._pending.append(row)
+            pending = len(self._pending)
+        
+        if pending >= WRITE_BATCH_SIZE:
+            self._schedule_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                WRITE_BATCH_DELAY, self._schedule_flush
+            )
+    
+    def _schedule_flush(self):
+        """Hand the queued rows to the writer thread; event loop only."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        asyncio.get_running_loop().run_in_executor(self._db_executor, self.flush)
+    
+    def flush(self) -> bool:
+        """Write all queued results in a single transaction.
+        
+        Returns:
+            True if successful
+        """
+        with self._pending_lock:
+            rows, self._pending = self._pending, []
+        
+        if not rows:
+            return True
+        
+        try:
+            self._insert_rows(rows)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Database batch store error ({len(rows)} rows): {e}")
+        
+        # Retry row by row so one bad row doesn't lose the whole batch, and
+        # stop serving results that could not be saved from memory
+        failed = []
+        for row in rows:
+            try:
+                with self._lock:
+                    self._conn.execute(_INSERT_SQL, row)
+            except Exception as e:
+                logger.error(f"Database store error for result {row[0]}: {e}")
+                failed.append(row[0])
+        
+        self._forget(failed)
+        return not failed
+    
+    def _forget(self, result_ids: List[str]):
+        """Drop results from the result cache and the history mirror."""
+        if not result_ids:
+            return
+        
+        for result_id in result_ids:
+            self._results.delete(result_id)
+        
+        ids = set(result_ids)
+        with self._recent_lock:
+            self._recent = deque(
+                (item for item in self._recent if item.id not in ids),
+                maxlen=RECENT_HISTORY_SIZE
             )
-        ''')
+    
+    def _insert_rows(self, rows: List[Tuple]):
+        """Insert rows with one executemany inside a single transaction."""
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany(_INSERT_SQL, rows)
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+    
+    def store_results(self, items: List[Tuple[str, str, Optional[str], AnalysisResult]]) -> bool:
+        """Store several analysis results with a single commit.
         
-        conn.commit()
-        conn.close()
+        Args:
+            items: (result_id, text, topic, result) tuples
+            
+        Returns:
+            True if successful
+        """
+        if not items:
+            return True
+        
+        try:
+            rows = [self._row(*item) for item in items]
+            self._insert_rows(rows)
+            for (result_id, _, _, result), row in zip(items, rows):
+                self._results.set(result_id, result)
+                self._remember_recent(row)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Database batch store error ({len(items)} rows): {e}")
+            return False
     
     def store_result(self, result_id: str, text: str, topic: Optional[str], result: AnalysisResult) -> bool:
         """Store analysis result in database.
@@ -52,31 +364,41 @@ class DatabaseService:
             True if successful
         """
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                '''
-                INSERT INTO analysis_results (id, text, topic, result_data, timestamp)
-                VALUES (?, ?, ?, ?, ?)
-                ''',
-                (
-                    result_id,
-                    text,
-                    topic,
-                    result.model_dump_json(),
-                    datetime.now().isoformat()
-                )
-            )
-            
-            conn.commit()
-            conn.close()
+            row = self._row(result_id, text, topic, result)
+            with self._lock:
+                self._conn.execute(_INSERT_SQL, row)
+            self._results.set(result_id, result)
+            self._remember_recent(row)
             return True
             
         except Exception as e:
             logger.error(f"Database store error: {e}")
             return False
     
+    async def store_results_async(self, items: List[Tuple[str, str, Optional[str], AnalysisResult]]) -> bool:
+        """Run store_results on the writer thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._db_executor, self.store_results, items
+        )
+    
+    async def get_result_async(self, result_id: str) -> Optional[AnalysisResult]:
+        """Run get_result in a worker thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.get_result, result_id
+        )
+    
+    async def get_history_async(self, limit: int = 10) -> List[HistoryItem]:
+        """Run get_history in a worker thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.get_history, limit
+        )
+    
+    async def delete_result_async(self, result_id: str) -> bool:
+        """Run delete_result on the writer thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._db_executor, self.delete_result, result_id
+        )
+    
     def get_result(self, result_id: str) -> Optional[AnalysisResult]:
         """Get analysis result from database.
         
@@ -86,26 +408,25 @@ class DatabaseService:
         Returns:
             AnalysisResult if found, None otherwise
         """
+        result = self._results.get(result_id)
+        if result is None:
+            result = self._get_result_uncached(result_id)
+            if result is not None:
+                self._results.set(result_id, result)
+        return result
+    
+    def _get_result_uncached(self, result_id: str) -> Optional[AnalysisResult]:
+        """Load and parse a result from the database."""
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                'SELECT result_data FROM analysis_results WHERE id = ?',
-                (result_id,)
-            )
-            
-            row = cursor.fetchone()
-            conn.close()
+            if self._pending:
+                self.flush()
+            with self._reader() as conn:
+                row = conn.execute(_SELECT_RESULT_SQL, (result_id,)).fetchone()
             
             if row:
-                result_data = json.loads(row[0])
-                # Ensure id field exists
-                if 'id' not in result_data:
-                    result_data['id'] = result_id
-                if 'result_id' not in result_data:
-                    result_data['result_id'] = result_id
-                return AnalysisResult(**result_data)
+                # Stored by this service from a validated model, so rebuild it
+                # without running the validators again
+                return AnalysisResult.construct_trusted(from_json(row[0]))
             return None
             
         except Exception as e:
@@ -122,40 +443,33 @@ class DatabaseService:
             List of HistoryItem objects
         """
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                '''
-                SELECT id, text, topic, result_data, timestamp
-                FROM analysis_results
-                ORDER BY timestamp DESC
-                LIMIT ?
-                ''',
-                (limit,)
-            )
+            if self._data_version != self._current_data_version():
+                self._seed_recent()
+            with self._recent_lock:
+                if limit <= len(self._recent):
+                    return list(itertools.islice(self._recent, limit))
             
-            rows = cursor.fetchall()
-            conn.close()
-            
-            history_items = []
-            for row in rows:
-                result_data = json.loads(row[3])
-                history_items.append(HistoryItem(
-                    id=row[0],
-                    timestamp=datetime.fromisoformat(row[4]),
-                    text_preview=row[1][:100],  # First 100 characters
-                    overall_score=result_data['overall_score'],
-                    word_count=result_data['word_count'],
-                    topic=row[2]
-                ))
-            
-            return history_items
+            return self._query_history(limit)
             
         except Exception as e:
             logger.error(f"Database history error: {e}")
             return []
     
+    def _query_history(self, limit: int) -> List[HistoryItem]:
+        """Read the newest history items from the database."""
+        if self._pending:
+            self.flush()
+        with self._reader() as conn:
+            rows = conn.execute(_SELECT_HISTORY_SQL, (limit,)).fetchall()
+        
+        return [
+            _history_item(
+                row['id'], row['text'], row['topic'],
+                row['overall_score'], row['word_count'], row['ts_ms']
+            )
+            for row in rows
+        ]
+    
     def delete_result(self, result_id: str) -> bool:
         """Delete analysis result.
         
@@ -165,17 +479,12 @@ class DatabaseService:
         Returns:
             True if successful
         """
+        self._forget([result_id])
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                'DELETE FROM analysis_results WHERE id = ?',
-                (result_id,)
-            )
-            
-            conn.commit()
-            conn.close()
+            if self._pending:
+                self.flush()
+            with self._lock:
+                self._conn.execute(_DELETE_SQL, (result_id,))
             return True
             
         except Exception as e:
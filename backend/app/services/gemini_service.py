@@ -1,14 +1,37 @@
 """Service for interacting with Google Gemini API."""
 
 import google.generativeai as genai
-from typing import Dict, Any, Optional
+from google.api_core import exceptions as google_exceptions
+from typing import Any, Awaitable, Dict, List, Optional, Union
+from collections import deque
+from functools import lru_cache
 import asyncio
+import hashlib
+import random
+import sqlite3
+import threading
 import time
 from app.config import settings
+from app.utils.json_utils import extract_json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Output budget for the combined prompt, which answers three sections at once
+COMBINED_MAX_OUTPUT_TOKENS = 3000
+
+# Expected JSON type of each section of a combined response
+_SECTION_TYPES = {'grammar': list, 'coherence': dict, 'relevance': dict}
+
+# Length of the sliding window the request rate limit applies to, in seconds
+RATE_WINDOW = 60.0
+
+# Upper bound on a single retry backoff, in seconds
+MAX_RETRY_WAIT = 30.0
+
+# Minimum seconds between purges of expired response cache rows
+CACHE_PURGE_INTERVAL = 3600.0
+
 class GeminiService:
     """Service for Gemini API interactions."""
     
@@ -23,47 +46,191 @@ class GeminiService:
         # Initialize the model
         self.model = genai.GenerativeModel(settings.gemini_model)
         
-        # Rate limiting
-        self.last_request_time = 0
-        self.min_request_interval = 60 / settings.gemini_rate_limit  # seconds between requests
+        # Rate limiting: up to gemini_concurrency requests in flight, and at
+        # most gemini_rate_limit started in any RATE_WINDOW seconds
+        self._semaphore = asyncio.Semaphore(settings.gemini_concurrency)
+        self._window_lock = asyncio.Lock()
+        self._request_times: deque = deque()
         
         self.logger = logger
+        
+        # Exact-match response cache in its own database file, so its commits
+        # neither checkpoint analysis.db nor invalidate DatabaseService's
+        # recent-history mirror
+        self._cache_conn: Optional[sqlite3.Connection] = None
+        self._cache_lock = threading.Lock()
+        self._last_purge = 0.0
+        if settings.cache_enabled:
+            try:
+                self._cache_conn = sqlite3.connect(
+                    str(settings.cache_dir / "gemini.db"),
+                    check_same_thread=False,
+                    isolation_level=None,
+                    timeout=5
+                )
+                self._cache_conn.execute('PRAGMA journal_mode=WAL')
+                self._cache_conn.execute('PRAGMA synchronous=NORMAL')
+                self._cache_conn.execute('''
+                    CREATE TABLE IF NOT EXISTS gemini_cache (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        ts REAL NOT NULL
+                    )
+                ''')
+            except sqlite3.Error as e:
+                self.logger.warning(f"Gemini response cache unavailable: {e}")
+                self._cache_conn = None
+    
+    def _cache_key(self, prompt: str, temperature: float, max_output_tokens: int) -> str:
+        """Build the response cache key for a request."""
+        return hashlib.sha256(
+            f"{settings.gemini_model}|{temperature}|{max_output_tokens}|{prompt}".encode()
+        ).hexdigest()
+    
+    @staticmethod
+    def _finished(response) -> bool:
+        """Whether the response's candidate stopped on its own, not at a limit."""
+        candidates = getattr(response, 'candidates', None)
+        if not candidates:
+            return False
+        reason = candidates[0].finish_reason
+        return getattr(reason, 'name', reason) in ('STOP', 1)
+    
+    def _get_cached(self, key: str) -> Optional[str]:
+        """Get a stored response if present and not expired."""
+        if self._cache_conn is None:
+            return None
+        
+        try:
+            with self._cache_lock:
+                row = self._cache_conn.execute(
+                    'SELECT response, ts FROM gemini_cache WHERE key = ?', (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.logger.warning(f"Gemini cache read error: {e}")
+            return None
+        
+        if row is None:
+            return None
+        if settings.gemini_cache_ttl and time.time() - row[1] > settings.gemini_cache_ttl:
+            return None
+        return row[0]
     
-    async def analyze_text(self, prompt: str, temperature: float = 0.3) -> str:
+    def _set_cached(self, key: str, response: str):
+        """Store a response under its cache key."""
+        if self._cache_conn is None:
+            return
+        
+        now = time.time()
+        try:
+            with self._cache_lock:
+                self._cache_conn.execute(
+                    'INSERT OR REPLACE INTO gemini_cache (key, response, ts) VALUES (?, ?, ?)',
+                    (key, response, now)
+                )
+                
+                # Expired rows are never read again; drop them now and then
+                if settings.gemini_cache_ttl and now - self._last_purge >= CACHE_PURGE_INTERVAL:
+                    self._last_purge = now
+                    self._cache_conn.execute(
+                        'DELETE FROM gemini_cache WHERE ts < ?',
+                        (now - settings.gemini_cache_ttl,)
+                    )
+        except sqlite3.Error as e:
+            self.logger.warning(f"Gemini cache write error: {e}")
+    
+    async def analyze_text(self, prompt: str, temperature: float = 0.3,
+                           max_output_tokens: int = 1000) -> str:
         """Send a text analysis request to Gemini.
         
         Args:
             prompt: The prompt to send
             temperature: Temperature for response generation
+            max_output_tokens: Maximum length of the response
             
         Returns:
             The model's response as a string
         """
-        # Rate limiting
-        await self._enforce_rate_limit()
+        # Identical prompts are answered from the cache without an API call
+        cache_key = self._cache_key(prompt, temperature, max_output_tokens)
+        cached = await asyncio.to_thread(self._get_cached, cache_key)
+        if cached is not None:
+            return cached
         
         try:
-            # Run in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.model.generate_content(
+            async with self._semaphore:
+                # Rate limiting
+                await self._enforce_rate_limit()
+                
+                # Native async call over the SDK's shared grpc.aio channel,
+                # so no executor thread is held for the round trip
+                response = await self.model.generate_content_async(
                     prompt,
                     generation_config=genai.types.GenerationConfig(
                         temperature=temperature,
-                        max_output_tokens=1000,
+                        max_output_tokens=max_output_tokens,
                     )
                 )
-            )
             
-            # Update last request time
-            self.last_request_time = time.time()
+            text = response.text
             
-            return response.text
+            # Truncated or filtered responses are not reused
+            if self._finished(response):
+                await asyncio.to_thread(self._set_cached, cache_key, text)
+            return text
             
         except Exception as e:
             self.logger.error(f"Gemini API error: {e}")
-            raise Exception(f"Failed to get response from Gemini: {str(e)}")
+            raise Exception(f"Failed to get response from Gemini: {str(e)}") from e
+    
+    async def analyze_text_json(self, prompt: str, container: type = dict,
+                                temperature: float = 0.3,
+                                max_output_tokens: int = 1000) -> Union[dict, list]:
+        """Send a request whose response is JSON and decode it.
+        
+        Args:
+            prompt: The prompt to send
+            container: dict or list, the expected top-level type
+            temperature: Temperature for response generation
+            max_output_tokens: Maximum length of the response
+            
+        Returns:
+            Decoded response, or an empty container when it holds no JSON
+        """
+        response = await self.analyze_text(
+            prompt, temperature=temperature, max_output_tokens=max_output_tokens
+        )
+        return extract_json(response, container)
+    
+    async def analyze_combined(self, text: str, topics: Optional[List[str]] = None,
+                               sections: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Get grammar, coherence and relevance feedback from one request.
+        
+        Args:
+            text: Text to analyze
+            topics: Topics for the relevance section; omitted when empty
+            sections: Sections to request; defaults to all applicable ones
+            
+        Returns:
+            Response sections keyed by name, or None if the request failed
+            or the response could not be parsed (e.g. it was truncated)
+        """
+        prompt = self.create_combined_prompt(
+            text, ', '.join(topics) if topics else None, sections
+        )
+        
+        try:
+            sections = await self.analyze_text_json(
+                prompt, max_output_tokens=COMBINED_MAX_OUTPUT_TOKENS
+            )
+        except Exception as e:
+            self.logger.warning(f"Combined Gemini analysis failed: {e}")
+            return None
+        
+        return {
+            name: sections[name] for name, kind in _SECTION_TYPES.items()
+            if isinstance(sections.get(name), kind)
+        } or None
     
     async def analyze_with_retry(self, prompt: str, max_retries: int = 3) -> Optional[str]:
         """Analyze text with retry logic.
@@ -79,25 +246,52 @@ class GeminiService:
             try:
                 return await self.analyze_text(prompt)
             except Exception as e:
+                if not self._is_retryable(e):
+                    self.logger.error(f"Not retrying permanent error: {e}")
+                    return None
+                
                 if attempt == max_retries - 1:
                     self.logger.error(f"All retries failed: {e}")
                     return None
                 
-                # Exponential backoff
-                wait_time = (2 ** attempt) * 1
+                # Exponential backoff with full jitter, so concurrent callers
+                # that failed together don't retry in lockstep
+                wait_time = random.uniform(0, min(MAX_RETRY_WAIT, 2 ** attempt))
                 self.logger.warning(f"Retry {attempt + 1} after {wait_time}s due to: {e}")
                 await asyncio.sleep(wait_time)
         
         return None
     
-    async def _enforce_rate_limit(self):
-        """Enforce rate limiting between requests."""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Whether a failed request may succeed when sent again.
         
-        if time_since_last_request < self.min_request_interval:
-            wait_time = self.min_request_interval - time_since_last_request
-            await asyncio.sleep(wait_time)
+        Args:
+            error: Exception raised by analyze_text
+            
+        Returns:
+            False for client errors such as invalid arguments or permission
+            failures, True for rate limits, server errors and timeouts
+        """
+        cause = error.__cause__ or error
+        if isinstance(cause, google_exceptions.TooManyRequests):
+            return True
+        return not isinstance(cause, google_exceptions.ClientError)
+    
+    async def _enforce_rate_limit(self):
+        """Wait until the sliding window has room, then record a request."""
+        async with self._window_lock:
+            while True:
+                now = time.monotonic()
+                while self._request_times and now - self._request_times[0] >= RATE_WINDOW:
+                    self._request_times.popleft()
+                
+                if len(self._request_times) < settings.gemini_rate_limit:
+                    self._request_times.append(now)
+                    return
+                
+                # Sleep until the oldest request leaves the window
+                await asyncio.sleep(RATE_WINDOW - (now - self._request_times[0]))
     
     def create_grammar_prompt(self, text: str) -> str:
         """Create a prompt for grammar analysis.
@@ -196,4 +390,181 @@ class GeminiService:
         
         Text to analyze:
         {text}
-        """
\ No newline at end of file
+        """
+    
+    def create_combined_prompt(self, text: str, topics: Optional[str] = None,
+                               sections: Optional[List[str]] = None) -> str:
+        """Create a single prompt covering several analysis sections.
+        
+        Args:
+            text: Text to analyze
+            topics: Topic(s) to check relevance against; None skips relevance
+            sections: Sections to request; defaults to all applicable ones
+            
+        Returns:
+            Formatted prompt
+        """
+        if sections is None:
+            sections = list(_SECTION_TYPES)
+        if not topics:
+            sections = [name for name in sections if name != 'relevance']
+        
+        requests = {
+            'grammar': '"grammar": significant grammar, spelling, punctuation, style and clarity errors',
+            'coherence': '"coherence": logical flow, transitions, clarity of argument and disconnected sections',
+            'relevance': f'"relevance": how well the text addresses the topic(s): {topics}'
+        }
+        schemas = {
+            'grammar': """"grammar": [
+                {
+                    "type": "grammar|spelling|punctuation|style|clarity",
+                    "severity": "low|medium|high",
+                    "position": [start_char, end_char],
+                    "message": "Description of the error",
+                    "suggestion": "How to fix it",
+                    "explanation": "Why this is an error"
+                }
+            ]""",
+            'coherence': """"coherence": {
+                "overall_coherence": "excellent|good|fair|poor",
+                "main_issues": ["issue1", "issue2"],
+                "strengths": ["strength1", "strength2"],
+                "specific_improvements": ["improvement1", "improvement2"]
+            }""",
+            'relevance': """"relevance": {
+                "overall_relevance": "excellent|good|fair|poor",
+                "well_covered_aspects": ["aspect1", "aspect2"],
+                "missing_aspects": ["aspect1", "aspect2"],
+                "off_topic_sections": ["description1", "description2"],
+                "improvement_suggestions": ["suggestion1", "suggestion2"]
+            }"""
+        }
+        
+        request_lines = '\n'.join(
+            f"        {i}. {requests[name]}" for i, name in enumerate(sections, 1)
+        )
+        schema_body = ',\n            '.join(schemas[name] for name in sections)
+        grammar_note = (
+            '\n        Use an empty array for "grammar" if no significant errors are found.\n'
+            if 'grammar' in sections else ''
+        )
+        
+        return f"""Analyze the text at the end of this prompt and report on each section below.
+{request_lines}
+        
+        Return ONLY one JSON object in this exact format:
+        {{
+            {schema_body}
+        }}
+        {grammar_note}
+        Text to analyze:
+        {text}
+        """
+
+class CombinedRequest:
+    """One combined Gemini request shared by the analyzers of a single text.
+    
+    Each analyzer either asks for its section or skips it, e.g. after a
+    semantic cache hit. The request is sent once every analyzer has done
+    one or the other and only covers the sections that were asked for;
+    the askers all await the same response. A missing or malformed
+    section is returned as None so the analyzer can fall back to its own
+    prompt.
+    """
+    
+    def __init__(self, service: GeminiService, topics: Optional[List[str]] = None):
+        """Initialize the request.
+        
+        Args:
+            service: Gemini service used for the call
+            topics: Topics for the relevance section
+        """
+        self.service = service
+        self.topics = topics
+        self.expected = {'grammar', 'coherence'} | ({'relevance'} if topics else set())
+        self._declared: set = set()
+        self._requested: set = set()
+        self._text: Optional[str] = None
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Future] = None
+    
+    def _declare(self, name: str, needed: bool):
+        """Record whether an analyzer needs its section; send once all have."""
+        if name in self._declared:
+            return
+        self._declared.add(name)
+        if needed:
+            self._requested.add(name)
+        
+        if self._declared >= self.expected:
+            if self._requested:
+                self._task = asyncio.ensure_future(self.service.analyze_combined(
+                    self._text, self.topics,
+                    [section for section in _SECTION_TYPES if section in self._requested]
+                ))
+            self._ready.set()
+    
+    def skip(self, name: str):
+        """Leave a section out of the request; no-op once it was asked for.
+        
+        Args:
+            name: "grammar", "coherence" or "relevance"
+        """
+        self._declare(name, False)
+    
+    async def section(self, name: str, text: str) -> Optional[Any]:
+        """Get one section of the combined response.
+        
+        Args:
+            name: "grammar", "coherence" or "relevance"
+            text: Preprocessed text being analyzed
+            
+        Returns:
+            The section's decoded JSON, or None if it is unavailable
+        """
+        if self._text is None:
+            self._text = text
+        self._declare(name, True)
+        
+        await self._ready.wait()
+        sections = await asyncio.shield(self._task)
+        return sections.get(name) if sections else None
+    
+    async def participate(self, name: str, analysis: Awaitable) -> Any:
+        """Await an analyzer, skipping its section if it never asked for it.
+        
+        Args:
+            name: Section the analyzer would ask for
+            analysis: The analyzer's analyze() coroutine
+            
+        Returns:
+            The analyzer's result
+        """
+        try:
+            return await analysis
+        finally:
+            self.skip(name)
+
+@lru_cache(maxsize=1)
+def get_gemini_service() -> Optional[GeminiService]:
+    """Get the process-wide Gemini service, or None without an API key."""
+    return GeminiService() if settings.gemini_api_key else None
+
+def create_combined_request(topic: Optional[str] = None,
+                            topics: Optional[List[str]] = None) -> Optional[CombinedRequest]:
+    """Create the combined request for one analysis.
+    
+    Args:
+        topic: Single topic string
+        topics: List of topics
+        
+    Returns:
+        CombinedRequest, or None when Gemini is not configured
+    """
+    service = get_gemini_service()
+    if service is None:
+        return None
+    
+    # Same topic order the relevance analyzer uses
+    all_topics = ([topic] if topic else []) + (topics or [])
+    return CombinedRequest(service, all_topics)
\ No newline at end of file
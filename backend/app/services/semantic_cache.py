@@ -0,0 +1,168 @@
+"""Similarity-keyed cache for LLM responses."""
+
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import diskcache
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rows allocated for the embedding matrix before it first grows
+INITIAL_CAPACITY = 64
+
+class SemanticCache:
+    """Cache that returns a stored response for any sufficiently similar query.
+    
+    Queries are unit-length document embeddings. Lookups are a single
+    matrix-vector product against every stored embedding, so paraphrased
+    texts reuse an earlier response instead of waiting on the API. An
+    optional tag, such as the topics of a relevance prompt, must match
+    exactly for an entry to count. Entries are persisted with diskcache and
+    reloaded on startup in insertion order; the disk writes run in a worker
+    thread so they never block the event loop.
+    
+    Embeddings live in a preallocated matrix that doubles up to max_entries
+    rows; once full it is used as a ring buffer, so each insert overwrites
+    the oldest entry in place.
+    """
+    
+    def __init__(self, path: Path, threshold: float = 0.92, max_entries: int = 5000):
+        """Initialize the semantic cache.
+        
+        Args:
+            path: Directory for the persistent store
+            threshold: Minimum cosine similarity counted as a hit
+            max_entries: Maximum number of responses kept
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._store = diskcache.Cache(str(path))
+        self._matrix: Optional[np.ndarray] = None
+        self._tags = np.empty(0, dtype=object)
+        self._keys: List[Optional[str]] = []
+        self._responses: List[Any] = []
+        self._slots: Dict[str, int] = {}
+        self._size = 0
+        self._next = 0
+        self._seq = 0
+        
+        entries = []
+        for key in self._store.iterkeys():
+            entry = self._store.get(key)
+            if entry is not None:
+                entries.append((entry.get('seq', 0), key, entry))
+        entries.sort(key=lambda item: item[0])
+        
+        # Entries beyond the limit (e.g. after lowering it) are the oldest
+        overflow = len(entries) - max_entries
+        if overflow > 0:
+            for _, key, _ in entries[:overflow]:
+                self._store.delete(key)
+            del entries[:overflow]
+        
+        for seq, key, entry in entries:
+            self._add(key, np.frombuffer(entry['vector'], dtype=np.float32),
+                      entry['response'], entry.get('tag'))
+            self._seq = seq + 1
+        
+        logger.info(f"Semantic cache loaded {self._size} entries from {path}")
+    
+    def get(self, vector: np.ndarray, tag: Optional[str] = None) -> Optional[Any]:
+        """Look up the response stored for the most similar query.
+        
+        Args:
+            vector: Unit-length query embedding
+            tag: Tag the stored entry must have
+        
+        Returns:
+            Cached response, or None when nothing is similar enough
+        """
+        if not self._size:
+            return None
+        
+        similarities = self._matrix[:self._size] @ vector.astype(np.float32)
+        if tag is not None:
+            similarities = np.where(self._tags[:self._size] == tag, similarities, -1.0)
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.threshold:
+            return self._responses[best]
+        
+        return None
+    
+    async def set(self, vector: np.ndarray, response: Any, tag: Optional[str] = None):
+        """Store a response under its query embedding.
+        
+        Args:
+            vector: Unit-length query embedding
+            response: Response to return for similar queries
+            tag: Tag that later lookups must match
+        """
+        vector = np.ascontiguousarray(vector, dtype=np.float32)
+        digest = hashlib.blake2b(vector.tobytes(), digest_size=16)
+        digest.update((tag or '').encode())
+        key = digest.hexdigest()
+        
+        # Concurrent misses for the same text store it only once
+        if key in self._slots:
+            return
+        
+        # Update memory first so lookups see the entry while it is written out
+        entry = {
+            'vector': vector.tobytes(), 'response': response, 'tag': tag, 'seq': self._seq
+        }
+        self._seq += 1
+        evicted = self._add(key, vector, response, tag)
+        await asyncio.to_thread(self._persist, key, entry, evicted)
+    
+    def _persist(self, key: str, entry: Dict[str, Any], evicted: Optional[str]):
+        """Write an entry to disk and drop the one it replaced."""
+        self._store.set(key, entry)
+        if evicted is not None:
+            self._store.delete(evicted)
+    
+    def _add(self, key: str, vector: np.ndarray, response: Any,
+             tag: Optional[str]) -> Optional[str]:
+        """Put an entry in the next slot, evicting the oldest when full.
+        
+        Returns:
+            Key of the evicted entry, if any
+        """
+        evicted = None
+        if self._size < self.max_entries:
+            slot = self._size
+            self._reserve(slot + 1, vector.shape[0])
+            self._keys.append(key)
+            self._responses.append(response)
+            self._size += 1
+        else:
+            slot = self._next
+            self._next = (slot + 1) % self.max_entries
+            evicted = self._keys[slot]
+            del self._slots[evicted]
+            self._keys[slot] = key
+            self._responses[slot] = response
+        
+        self._matrix[slot] = vector
+        self._tags[slot] = tag
+        self._slots[key] = slot
+        
+        return evicted
+    
+    def _reserve(self, rows: int, dim: int):
+        """Grow the matrix and tag array geometrically to hold rows entries."""
+        capacity = 0 if self._matrix is None else self._matrix.shape[0]
+        if rows <= capacity:
+            return
+        
+        capacity = min(self.max_entries, max(rows, capacity * 2, INITIAL_CAPACITY))
+        matrix = np.empty((capacity, dim), dtype=np.float32)
+        tags = np.empty(capacity, dtype=object)
+        if self._size:
+            matrix[:self._size] = self._matrix[:self._size]
+            tags[:self._size] = self._tags[:self._size]
+        self._matrix = matrix
+        self._tags = tags
\ No newline at end of file
@@ -8,12 +8,25 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Applied to the migration connection; WAL mode persists in the database file
+_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+)
+
 class DatabaseMigration:
     """Handle database migrations."""
     
     def __init__(self):
         """Initialize migration handler."""
         self.db_path = settings.data_dir / "analysis.db"
+        
+        # One autocommit connection shared by all migration steps
+        self.conn = sqlite3.connect(str(self.db_path), isolation_level=None)
+        for pragma in _PRAGMAS:
+            self.conn.execute(pragma)
+        
         self.migrations: List[Tuple[int, str]] = [
             # Add new migrations here with version number and SQL
             (1, '''
@@ -32,14 +45,52 @@ class DatabaseMigration:
             (3, '''
                 CREATE INDEX IF NOT EXISTS idx_analysis_topic 
                 ON analysis_results(topic)
+            '''),
+            # Copy the fields listed in history out of result_data so
+            # history reads don't have to parse the JSON
+            (4, '''
+                ALTER TABLE analysis_results ADD COLUMN overall_score REAL;
+                ALTER TABLE analysis_results ADD COLUMN word_count INTEGER;
+                UPDATE analysis_results SET
+                    overall_score = json_extract(result_data, '$.overall_score'),
+                    word_count = json_extract(result_data, '$.word_count');
+            '''),
+            # Integer epoch milliseconds for ordering history; the local ISO
+            # timestamps are converted to UTC like datetime.timestamp() does
+            (5, '''
+                ALTER TABLE analysis_results ADD COLUMN ts_ms INTEGER;
+                UPDATE analysis_results SET ts_ms =
+                    CAST(ROUND((julianday(timestamp, 'utc') - 2440587.5) * 86400000) AS INTEGER);
+                CREATE INDEX IF NOT EXISTS idx_analysis_ts_ms
+                ON analysis_results(ts_ms);
+            '''),
+            # Gemini responses keyed by a digest of model, temperature and prompt
+            (6, '''
+                CREATE TABLE IF NOT EXISTS gemini_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    ts REAL NOT NULL
+                )
+            '''),
+            # Nothing orders by the ISO timestamp any more, and the topic
+            # index becomes a prefix of the (topic, ts_ms, id) index that
+            # answers latest-by-topic reads from the index alone
+            (7, '''
+                DROP INDEX IF EXISTS idx_analysis_timestamp;
+                CREATE INDEX IF NOT EXISTS idx_analysis_topic_ts
+                ON analysis_results(topic, ts_ms DESC, id);
+                DROP INDEX IF EXISTS idx_analysis_topic;
+            '''),
+            # The Gemini response cache moved to its own file under cache_dir
+            (8, '''
+                DROP TABLE IF EXISTS gemini_cache;
             ''')
         ]
     
     def get_current_version(self) -> int:
         """Get current database version."""
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
+            cursor = self.conn.cursor()
             
             # Create version table if it doesn't exist
             cursor.execute('''
@@ -52,7 +103,6 @@ class DatabaseMigration:
             cursor.execute('SELECT version FROM db_version')
             row = cursor.fetchone()
             
-            conn.close()
             return row[0] if row else 0
             
         except Exception as e:
@@ -62,16 +112,12 @@ class DatabaseMigration:
     def set_version(self, version: int):
         """Set database version."""
         try:
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
+            cursor = self.conn.cursor()
             
             # Update version
             cursor.execute('DELETE FROM db_version')
             cursor.execute('INSERT INTO db_version (version) VALUES (?)', (version,))
             
-            conn.commit()
-            conn.close()
-            
         except Exception as e:
             logger.error(f"Error setting database version: {e}")
             raise
@@ -88,16 +134,24 @@ class DatabaseMigration:
                 logger.info("No pending migrations")
                 return True
             
-            conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
+            cursor = self.conn.cursor()
             
             for version, sql in pending_migrations:
                 logger.info(f"Running migration {version}")
-                cursor.executescript(sql)
-                self.set_version(version)
-            
-            conn.commit()
-            conn.close()
+                
+                # Schema change and version bump commit together, so a crash
+                # can't leave a migration applied but unrecorded
+                try:
+                    cursor.executescript(
+                        f"BEGIN;\n{sql}\n;"
+                        f"DELETE FROM db_version;"
+                        f"INSERT INTO db_version (version) VALUES ({int(version)});"
+                        f"COMMIT;"
+                    )
+                except Exception:
+                    if self.conn.in_transaction:
+                        self.conn.execute('ROLLBACK')
+                    raise
             
             logger.info("Migrations completed successfully")
             return True
@@ -105,8 +159,20 @@ class DatabaseMigration:
         except Exception as e:
             logger.error(f"Migration error: {e}")
             return False
+    
+    def close(self):
+        """Close the migration connection."""
+        self.conn.close()
 
 def run_migrations():
     """Run database migrations."""
-    migrator = DatabaseMigration()
-    return migrator.run_migrations() 
\ No newline at end of file
+    try:
+        migrator = DatabaseMigration()
+    except sqlite3.Error as e:
+        logger.error(f"Migration error: {e}")
+        return False
+    
+    try:
+        return migrator.run_migrations()
+    finally:
+        migrator.close() 
\ No newline at end of file
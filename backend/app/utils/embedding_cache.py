@@ -0,0 +1,181 @@
+"""Caching wrapper around sentence-transformer encoders."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+import diskcache
+import numpy as np
+import torch
+
+# Scale used to map unit-length float embeddings onto int8
+INT8_SCALE = 127
+
+def quantize_int8(embeddings: np.ndarray) -> np.ndarray:
+    """Quantize unit-length embeddings to int8.
+    
+    Args:
+        embeddings: Float array of normalized embeddings
+        
+    Returns:
+        int8 array with the same shape
+    """
+    return np.round(embeddings * INT8_SCALE).astype(np.int8)
+
+def int8_dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise dot product of int8 embeddings, rescaled to cosine range.
+    
+    Args:
+        a: int8 array of shape (N, dim) or (dim,)
+        b: int8 array with the same shape as ``a``
+        
+    Returns:
+        Float similarities of shape (N,), or a scalar for 1-D inputs
+    """
+    products = np.einsum('...i,...i->...', a.astype(np.int32), b.astype(np.int32))
+    return products / float(INT8_SCALE * INT8_SCALE)
+
+class CachedEncoder:
+    """LRU cache in front of a SentenceTransformer's ``encode`` method.
+    
+    Embeddings are keyed by a BLAKE2b digest of the sentence text so that
+    sentences repeated within a document, or across documents, are only
+    passed through the transformer once. An optional on-disk tier keeps
+    embeddings across restarts and shares them between worker processes.
+    """
+    
+    def __init__(self, model, maxsize: int = 10_000, precision: str = "float32",
+                 disk_dir: Optional[Path] = None, batch_size: int = 64):
+        """Initialize the encoder cache.
+        
+        Args:
+            model: SentenceTransformer instance used for cache misses
+            maxsize: Maximum number of embeddings kept in memory
+            precision: "float32" or "int8"; int8 embeddings are stored and
+                returned quantized, cutting memory per vector by 4x
+            disk_dir: Directory for the persistent tier; should be namespaced
+                by model and precision since vectors are stored as raw bytes
+            batch_size: Sentences per forward pass; the model sorts inputs by
+                length before batching, so similar lengths share a batch
+        """
+        if precision not in ("float32", "int8"):
+            raise ValueError(f"Unsupported embedding precision: {precision}")
+        
+        self.model = model
+        self.maxsize = maxsize
+        self.precision = precision
+        self.batch_size = batch_size
+        self.dtype = np.int8 if precision == "int8" else np.float32
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        
+        if disk_dir is not None:
+            self._disk = diskcache.Cache(str(disk_dir), size_limit=int(5e8))
+    
+    @staticmethod
+    def _key(sentence: str) -> bytes:
+        """Build the cache key for a sentence."""
+        return hashlib.blake2b(sentence.encode(), digest_size=16).digest()
+    
+    def encode(self, sentences: List[str]) -> np.ndarray:
+        """Encode sentences, only running the model for cache misses.
+        
+        Args:
+            sentences: Sentences to encode
+            
+        Returns:
+            Array of shape (len(sentences), dim) with unit-length embeddings,
+            quantized to int8 when the encoder uses int8 precision
+        """
+        keys = [self._key(s) for s in sentences]
+        vectors: List[np.ndarray] = [None] * len(sentences)
+        misses: List[int] = []
+        
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._cache.get(key)
+                if vector is None:
+                    misses.append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    vectors[i] = vector
+        
+        if misses and self._disk is not None:
+            misses = self._load_from_disk(keys, misses, vectors)
+        
+        if misses:
+            # Deduplicate so repeated sentences are encoded once
+            unique_keys = list(dict.fromkeys(keys[i] for i in misses))
+            unique_sentences = {keys[i]: sentences[i] for i in misses}
+            # inference_mode skips autograd version tracking entirely
+            with torch.inference_mode():
+                encoded = self.model.encode(
+                    [unique_sentences[k] for k in unique_keys],
+                    batch_size=self.batch_size,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+            if self.precision == "int8":
+                encoded = quantize_int8(encoded)
+            fresh = dict(zip(unique_keys, encoded))
+            
+            with self._lock:
+                for key, vector in fresh.items():
+                    self._cache[key] = vector
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.maxsize:
+                    self._cache.popitem(last=False)
+            
+            if self._disk is not None:
+                with self._disk.transact():
+                    for key, vector in fresh.items():
+                        self._disk.set(key, vector.tobytes())
+            
+            for i in misses:
+                vectors[i] = fresh[keys[i]]
+        
+        dim = self.model.get_sentence_embedding_dimension()
+        embeddings = np.empty((len(sentences), dim), dtype=self.dtype)
+        for i, vector in enumerate(vectors):
+            embeddings[i] = vector
+        
+        return embeddings
+    
+    def _load_from_disk(self, keys: List[bytes], misses: List[int],
+                        vectors: List[np.ndarray]) -> List[int]:
+        """Fill memory misses from the disk tier.
+        
+        Args:
+            keys: Cache keys for every requested sentence
+            misses: Indices not found in memory
+            vectors: Output list, filled in place for disk hits
+            
+        Returns:
+            Indices still missing after the disk lookup
+        """
+        remaining: List[int] = []
+        loaded = {}
+        
+        for i in misses:
+            key = keys[i]
+            if key not in loaded:
+                raw = self._disk.get(key)
+                loaded[key] = None if raw is None else np.frombuffer(raw, dtype=self.dtype)
+            if loaded[key] is None:
+                remaining.append(i)
+            else:
+                vectors[i] = loaded[key]
+        
+        # Promote disk hits so the next lookup stays in memory
+        with self._lock:
+            for key, vector in loaded.items():
+                if vector is not None:
+                    self._cache[key] = vector
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        
+        return remaining
\ No newline at end of file
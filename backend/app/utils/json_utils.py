@@ -0,0 +1,72 @@
+"""Helpers for pulling JSON out of free-form model responses."""
+
+import json
+import re
+from typing import Any, List, Union
+
+from pydantic_core import from_json
+
+# Shared decoder; raw_decode parses one value and reports where it ended
+_DECODER = json.JSONDecoder()
+
+# A whole response that is one value, optionally inside a ```json fence
+_FENCED_RE = re.compile(r'\s*(?:```(?:json)?\s*)?(.*?)\s*(?:```)?\s*', re.DOTALL)
+
+# Whitespace and commas between array elements
+_SEPARATOR_RE = re.compile(r'[\s,]*')
+
+def extract_json(text: str, container: type = dict) -> Union[dict, list]:
+    """Decode the first JSON object or array embedded in a response.
+    
+    A response that is nothing but the JSON value, optionally fenced, is
+    decoded directly by pydantic-core's Rust parser. Otherwise parsing starts
+    at the first opening bracket and stops at the end of that value, so
+    trailing prose or code fences are never scanned. For arrays, a truncated
+    or malformed response still yields its well-formed prefix.
+    
+    Args:
+        text: Model response that contains JSON somewhere in it
+        container: dict or list, the expected top-level type
+    
+    Returns:
+        Decoded value, or an empty container when the response holds none
+    
+    Raises:
+        json.JSONDecodeError: If the JSON is malformed and nothing was recovered
+    """
+    body = _FENCED_RE.fullmatch(text).group(1)
+    if body[:1] == ('[' if container is list else '{'):
+        try:
+            value = from_json(body)
+        except ValueError:
+            pass
+        else:
+            return value if isinstance(value, container) else container()
+    
+    start = text.find('[' if container is list else '{')
+    if start < 0:
+        return container()
+    
+    try:
+        value, _ = _DECODER.raw_decode(text, start)
+    except json.JSONDecodeError:
+        if container is list:
+            items = _decode_array_prefix(text, start)
+            if items:
+                return items
+        raise
+    
+    return value if isinstance(value, container) else container()
+
+def _decode_array_prefix(text: str, start: int) -> List[Any]:
+    """Decode array elements one at a time until the first malformed one."""
+    items = []
+    pos = start + 1
+    
+    while True:
+        pos = _SEPARATOR_RE.match(text, pos).end()
+        try:
+            item, pos = _DECODER.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            return items
+        items.append(item)
\ No newline at end of file
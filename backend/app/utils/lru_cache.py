@@ -0,0 +1,79 @@
+"""Small thread-safe LRU cache keyed by text digests."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+def text_key(*parts: Optional[str]) -> bytes:
+    """Build a compact cache key from one or more text parts.
+    
+    Args:
+        parts: Strings identifying the cached value; None is treated as empty
+    
+    Returns:
+        16-byte BLAKE2b digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update((part or '').encode())
+        digest.update(b'\x00')
+    return digest.digest()
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry."""
+    
+    def __init__(self, maxsize: int = 1024):
+        """Initialize the cache.
+        
+        Args:
+            maxsize: Maximum number of entries kept
+        """
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Get a cached value, marking it as recently used.
+        
+        Args:
+            key: Cache key
+        
+        Returns:
+            Cached value or None
+        """
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the oldest entry when full.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def delete(self, key: Hashable):
+        """Remove an entry if present.
+        
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""Readability metrics shared by the analyzers."""
+
+from functools import lru_cache
+from typing import Dict
+
+import textstat
+
+@lru_cache(maxsize=256)
+def readability_metrics(text: str) -> Dict[str, float]:
+    """Compute readability metrics for a text.
+    
+    textstat memoizes its sentence, word and syllable counts per text, so
+    the formulas share one tokenization pass; the combined result is
+    memoized here so every analyzer scoring the same text reuses it.
+    Callers must copy the returned dict before mutating it.
+    
+    Args:
+        text: Preprocessed text
+    
+    Returns:
+        Dictionary of readability scores
+    """
+    return {
+        'flesch_reading_ease': textstat.flesch_reading_ease(text),
+        'flesch_kincaid_grade': textstat.flesch_kincaid_grade(text),
+        'gunning_fog': textstat.gunning_fog(text),
+        'smog_index': textstat.smog_index(text),
+        'automated_readability_index': textstat.automated_readability_index(text),
+        'coleman_liau_index': textstat.coleman_liau_index(text),
+        'linsear_write_formula': textstat.linsear_write_formula(text),
+        'dale_chall_readability': textstat.dale_chall_readability_score(text)
+    }
\ No newline at end of file
@@ -0,0 +1,17 @@
+"""Response classes for the API."""
+
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by pydantic-core's Rust serializer.
+    
+    Produces compact UTF-8 JSON like the stdlib renderer but much faster on
+    large nested payloads such as batch results and history pages, and
+    also handles datetimes, enums and models left in the content.
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
\ No newline at end of file
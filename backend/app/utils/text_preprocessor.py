@@ -1,12 +1,14 @@
 """Text preprocessing utilities."""
 
+import asyncio
+import io
 import re
-from typing import Optional, List
+import threading
+from typing import BinaryIO, Optional, List, Union
 import unicodedata
 from pathlib import Path
 import PyPDF2
 from docx import Document
-import chardet
 import logging
 import nltk
 from nltk.tokenize import word_tokenize
@@ -14,6 +16,28 @@ from nltk.corpus import stopwords
 
 logger = logging.getLogger(__name__)
 
+# Fastest available charset detector: cchardet (C), charset-normalizer, then chardet
+try:
+    from cchardet import detect as _detect
+except ImportError:
+    try:
+        from charset_normalizer import detect as _detect
+    except ImportError:
+        from chardet import detect as _detect
+
+# PDFium bindings for fast PDF text extraction; PyPDF2 is used without them
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# PDFium is not thread-safe, even across documents, so concurrent uploads
+# take turns extracting
+_PDFIUM_LOCK = threading.Lock()
+
+# Bytes of an upload sampled for encoding detection
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
 # Mapping of common special characters to their standard equivalents
 SPECIAL_CHAR_MAP = {
     '“': '"',
@@ -40,6 +64,58 @@ SPECIAL_CHAR_MAP = {
     '¥': 'JPY',
 }
 
+# Patterns used by TextPreprocessor, compiled once at import
+_RE_MULTI_SPACE = re.compile(r' +')
+_RE_PARA = re.compile(r'\n\s*\n')
+_RE_SPACE_PUNCT = re.compile(r' +([.,!?;:])')
+_RE_PUNCT_LETTER = re.compile(r'([.,!?;:])([A-Za-z])')
+_RE_SENT = re.compile(r'([.!?])\s*([A-Z])')
+_RE_COMMA = re.compile(r',([A-Za-z])')
+
+# Characters dropped by preprocess_text before tokenizing
+_RE_NON_ALPHA = re.compile(r'[^a-zA-Z\s]')
+
+# Control characters except newlines, tabs and carriage returns, deleted via translate
+_CONTROL_CHARS_TABLE = str.maketrans('', '', ''.join(
+    chr(i) for i in range(32)
+    if chr(i) not in ['\n', '\t', '\r']
+))
+
+# Smart quotes and apostrophes mapped to their ASCII forms
+_QUOTES_TABLE = str.maketrans({
+    '\u201c': '"',
+    '\u201d': '"',
+    '\u2018': "'",
+    '\u2019': "'"
+})
+
+# Quote normalization and control character removal in a single translate
+_CLEANUP_TABLE = {**_QUOTES_TABLE, **_CONTROL_CHARS_TABLE}
+
+# UTF-8 text mis-decoded as cp1252, mapped back to the intended characters
+_MOJIBAKE_MAP = {
+    'â€™': "'",
+    'â€œ': '"',
+    'â€': '"',
+    'â€"': '—',
+    'â€“': '–',
+    'Ã©': 'é',
+    'Ã¨': 'è',
+    'Ã ': 'à',
+    'Ã¢': 'â',
+    'Ã´': 'ô',
+    'Ã®': 'î',
+    'Ã§': 'ç',
+    'Ã‰': 'É',
+    "âˆ'": '-',
+}
+
+# All mojibake sequences in one alternation, longest first so a sequence is
+# never shadowed by its own prefix
+_RE_MOJIBAKE = re.compile('|'.join(
+    re.escape(seq) for seq in sorted(_MOJIBAKE_MAP, key=len, reverse=True)
+))
+
 # Download required NLTK data
 try:
     nltk.data.find('tokenizers/punkt')
@@ -82,7 +158,7 @@ def preprocess_text(text: str) -> List[str]:
     text = text.lower()
     
     # Remove special characters and numbers
-    text = re.sub(r'[^a-zA-Z\s]', '', text)
+    text = _RE_NON_ALPHA.sub('', text)
     
     # Tokenize
     tokens = word_tokenize(text)
@@ -112,31 +188,34 @@ class TextPreprocessor:
         # Remove null bytes
         text = text.replace('\x00', '')
         
-        # Normalize unicode
-        text = unicodedata.normalize('NFKD', text)
-        
-        # Fix common encoding issues
-        text = self._fix_encoding_issues(text)
+        # ASCII text holds no mojibake and is unchanged by NFKD, so both
+        # passes are skipped; isascii() reads a flag on the string object
+        if not text.isascii():
+            # Fix common encoding issues; must run before NFKD, which
+            # decomposes the 'â' and 'Ã' every mojibake sequence starts with
+            text = self._fix_encoding_issues(text)
+            
+            # Normalize unicode
+            text = unicodedata.normalize('NFKD', text)
         
         # Normalize whitespace
         text = self._normalize_whitespace(text)
         
-        # Fix quotes and apostrophes
-        text = self._normalize_quotes(text)
-        
-        # Remove control characters
-        text = self._remove_control_characters(text)
+        # Fix quotes and remove control characters in one pass
+        text = text.translate(_CLEANUP_TABLE)
         
         # Ensure proper sentence spacing
         text = self._fix_sentence_spacing(text)
         
         return text.strip()
     
-    async def extract_text_from_file(self, file_content: bytes, filename: str) -> str:
+    async def extract_text_from_file(self, file_content: Union[bytes, BinaryIO],
+                                     filename: str) -> str:
         """Extract text from various file formats.
         
         Args:
-            file_content: File content as bytes
+            file_content: File content as bytes, or a seekable binary file
+                positioned at the start (e.g. a spooled upload)
             filename: Original filename with extension
             
         Returns:
@@ -144,27 +223,37 @@ class TextPreprocessor:
         """
         extension = Path(filename).suffix.lower()
         
+        if isinstance(file_content, (bytes, bytearray)):
+            file_content = io.BytesIO(file_content)
+        
+        # Extraction and processing are blocking, so they run in a worker
+        # thread and the event loop keeps serving other requests
         if extension == '.txt':
-            return self._extract_from_txt(file_content)
+            return await asyncio.to_thread(self._extract_from_txt, file_content)
         elif extension == '.pdf':
-            return self._extract_from_pdf(file_content)
+            return await asyncio.to_thread(self._extract_from_pdf, file_content)
         elif extension in ['.docx', '.doc']:
-            return self._extract_from_docx(file_content)
+            return await asyncio.to_thread(self._extract_from_docx, file_content)
         else:
             raise ValueError(f"Unsupported file type: {extension}")
     
-    def _extract_from_txt(self, content: bytes) -> str:
+    def _extract_from_txt(self, file: BinaryIO) -> str:
         """Extract text from TXT file.
         
         Args:
-            content: File content
+            file: Binary file with the content
             
         Returns:
             Extracted text
         """
-        # Detect encoding
-        detected = chardet.detect(content)
+        content = file.read()
+        
+        # Detect encoding from a leading sample; an ASCII sample may still be
+        # followed by UTF-8, which decodes ASCII identically
+        detected = _detect(content[:ENCODING_SAMPLE_SIZE])
         encoding = detected['encoding'] or 'utf-8'
+        if encoding.lower() == 'ascii':
+            encoding = 'utf-8'
         
         try:
             text = content.decode(encoding)
@@ -175,19 +264,19 @@ class TextPreprocessor:
         
         return self.process(text)
     
-    def _extract_from_pdf(self, content: bytes) -> str:
+    def _extract_from_pdf(self, file: BinaryIO) -> str:
         """Extract text from PDF file.
         
         Args:
-            content: PDF file content
+            file: Binary file with the PDF content
             
         Returns:
             Extracted text
         """
-        import io
+        if pdfium is not None:
+            return self.process(self._extract_pdf_text_pdfium(file))
         
-        pdf_file = io.BytesIO(content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        pdf_reader = PyPDF2.PdfReader(file)
         
         text_parts = []
         for page_num in range(len(pdf_reader.pages)):
@@ -197,19 +286,40 @@ class TextPreprocessor:
         text = '\n'.join(text_parts)
         return self.process(text)
     
-    def _extract_from_docx(self, content: bytes) -> str:
+    def _extract_pdf_text_pdfium(self, file: BinaryIO) -> str:
+        """Extract the text of every page with PDFium.
+        
+        Args:
+            file: Binary file with the PDF content
+            
+        Returns:
+            Page texts joined by newlines
+        """
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(file)
+            try:
+                text_parts = []
+                for page in pdf:
+                    textpage = page.get_textpage()
+                    text_parts.append(textpage.get_text_range())
+                    textpage.close()
+                    page.close()
+            finally:
+                pdf.close()
+        
+        # PDFium ends lines with CRLF; PyPDF2 and the rest of the pipeline use LF
+        return '\n'.join(text_parts).replace('\r\n', '\n')
+    
+    def _extract_from_docx(self, file: BinaryIO) -> str:
         """Extract text from DOCX file.
         
         Args:
-            content: DOCX file content
+            file: Binary file with the DOCX content
             
         Returns:
             Extracted text
         """
-        import io
-        
-        docx_file = io.BytesIO(content)
-        doc = Document(docx_file)
+        doc = Document(file)
         
         text_parts = []
         for paragraph in doc.paragraphs:
@@ -235,28 +345,8 @@ class TextPreprocessor:
         Returns:
             Fixed text
         """
-        # Common replacements
-        replacements = {
-            'â€™': "'",
-            'â€œ': '"',
-            'â€': '"',
-            'â€"': '—',
-            'â€“': '–',
-            'Ã©': 'é',
-            'Ã¨': 'è',
-            'Ã ': 'à',
-            'Ã¢': 'â',
-            'Ã´': 'ô',
-            'Ã®': 'î',
-            'Ã§': 'ç',
-            'Ã‰': 'É',
-            "âˆ'": '-',
-        }
-        
-        for old, new in replacements.items():
-            text = text.replace(old, new)
-        
-        return text
+        # One scan for every known sequence instead of a replace per entry
+        return _RE_MOJIBAKE.sub(lambda match: _MOJIBAKE_MAP[match.group()], text)
     
     def _normalize_whitespace(self, text: str) -> str:
         """Normalize whitespace in text.
@@ -268,16 +358,16 @@ class TextPreprocessor:
             Text with normalized whitespace
         """
         # Replace multiple spaces with single space
-        text = re.sub(r' +', ' ', text)
+        text = _RE_MULTI_SPACE.sub(' ', text)
         
         # Replace multiple newlines with double newline (paragraph break)
-        text = re.sub(r'\n\s*\n', '\n\n', text)
+        text = _RE_PARA.sub('\n\n', text)
         
         # Remove spaces before punctuation
-        text = re.sub(r' +([.,!?;:])', r'\1', text)
+        text = _RE_SPACE_PUNCT.sub(r'\1', text)
         
         # Ensure space after punctuation
-        text = re.sub(r'([.,!?;:])([A-Za-z])', r'\1 \2', text)
+        text = _RE_PUNCT_LETTER.sub(r'\1 \2', text)
         
         return text
     
@@ -290,15 +380,8 @@ class TextPreprocessor:
         Returns:
             Text with normalized quotes
         """
-        # Smart quotes to regular quotes
-        text = text.replace('"', '"').replace('"', '"')
-        text = text.replace("'", "'").replace("'", "'")
-        
-        # Fix apostrophes
-        text = re.sub(r"(\w)'(\w)", r"\1'\2", text)  # Contractions
-        text = re.sub(r"(\w)'s\b", r"\1's", text)   # Possessives
-        
-        return text
+        # Smart quotes and apostrophes to regular ones
+        return text.translate(_QUOTES_TABLE)
     
     def _remove_control_characters(self, text: str) -> str:
         """Remove control characters from text.
@@ -310,13 +393,7 @@ class TextPreprocessor:
             Cleaned text
         """
         # Remove all control characters except newlines and tabs
-        control_chars = ''.join(
-            chr(i) for i in range(32) 
-            if chr(i) not in ['\n', '\t', '\r']
-        )
-        translator = str.maketrans('', '', control_chars)
-        
-        return text.translate(translator)
+        return text.translate(_CONTROL_CHARS_TABLE)
     
     def _fix_sentence_spacing(self, text: str) -> str:
         """Ensure proper spacing between sentences.
@@ -328,10 +405,10 @@ class TextPreprocessor:
             Text with fixed sentence spacing
         """
         # Ensure single space after sentence-ending punctuation
-        text = re.sub(r'([.!?])\s*([A-Z])', r'\1 \2', text)
+        text = _RE_SENT.sub(r'\1 \2', text)
         
         # Fix missing spaces after commas
-        text = re.sub(r',([A-Za-z])', r', \1', text)
+        text = _RE_COMMA.sub(r', \1', text)
         
         return text
     
@@ -347,21 +424,23 @@ class TextPreprocessor:
         Returns:
             List of text chunks
         """
-        if len(text) <= chunk_size:
+        text_len = len(text)
+        if text_len <= chunk_size:
             return [text]
         
         chunks = []
         start = 0
+        half = chunk_size // 2
         
-        while start < len(text):
+        while start < text_len:
             # Find end position
             end = start + chunk_size
             
-            # Try to break at sentence boundary
-            if end < len(text):
-                # Look for sentence end
-                sentence_end = text.rfind('.', start, end)
-                if sentence_end > start + chunk_size // 2:
+            # Try to break at sentence boundary; only a period in the second
+            # half of the chunk is accepted, so the first half is not scanned
+            if end < text_len:
+                sentence_end = text.rfind('.', start + half + 1, end)
+                if sentence_end >= 0:
                     end = sentence_end + 1
             
             chunks.append(text[start:end])
@@ -370,7 +449,7 @@ class TextPreprocessor:
             start = end - overlap
             
             # Ensure we don't create tiny final chunks
-            if len(text) - start < chunk_size // 2 and chunks:
+            if text_len - start < half and chunks:
                 # Merge with previous chunk
                 chunks[-1] = chunks[-1] + text[start:]
                 break